@@ -1,6 +1,12 @@
 from django.contrib import admin
-from .models import Cart, CartItem
+from .models import Cart, CartItem, StockReservation
 
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
-    list_display = ["cart", "product", "quantity"]
\ No newline at end of file
+    list_display = ["cart", "product", "quantity"]
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ["cart", "product", "quantity", "expires_at"]
+    list_filter = ["expires_at"]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Now
 from django.conf import settings
 from products.models import Product
 
@@ -30,4 +31,35 @@ class CartItem(models.Model):
         return self.quantity * self.product.price
 
     def __str__(self):
-        return f"{self.quantity} x {self.product.title} in {self.cart}"
\ No newline at end of file
+        return f"{self.quantity} x {self.product.title} in {self.cart}"
+
+
+class StockReservationQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(expires_at__gt=Now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=Now())
+
+
+class StockReservation(models.Model):
+    """Units of a product held for a cart until `expires_at`"""
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="reservations")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="reservations")
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = StockReservationQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cart", "product"], name="unique_cart_product_reservation")
+        ]
+        indexes = [
+            # Summing a product's active holds
+            models.Index(fields=["product", "expires_at"], name="reservation_product_exp_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} held for {self.cart} until {self.expires_at}"
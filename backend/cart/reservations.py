@@ -0,0 +1,116 @@
+"""
+Time-boxed stock holds for carts.
+
+Adding to a cart holds the units for CART_HOLD_SECONDS; starting payment
+re-checks and extends every line's hold to PAYMENT_HOLD_SECONDS. A product's
+available-to-sell is its stock minus the active holds of other carts, so two
+customers cannot both be promised the last pair. Holds are never counted
+once expired, whether or not the sweep task has deleted them yet.
+
+Checkout converts a cart's holds into a sale: the held units were set aside
+when the hold was granted, so the stock can be taken with a single
+conditional UPDATE without re-checking availability.
+
+Flash sale products are not held: their lines are checked against the stock
+counter instead, which keeps add-to-cart off the hot product row.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from orders.flash_sale import check_available, flash_sale_ids
+from orders.locking import lock_products, run_with_lock_retry
+from products.models import Product
+from .models import StockReservation
+
+
+def held_quantity(exclude_cart=None):
+    """Subquery expression: units of OuterRef("pk") held by active reservations"""
+    holds = StockReservation.objects.active().filter(product_id=OuterRef("pk"))
+    if exclude_cart is not None:
+        holds = holds.exclude(cart=exclude_cart)
+    total = holds.order_by().values("product_id").annotate(total=Sum("quantity")).values("total")
+    return Coalesce(Subquery(total), Value(0))
+
+
+def available_to_sell(product_ids, exclude_cart=None):
+    """Map product id to stock minus other carts' active holds, in one query"""
+    rows = (
+        Product.objects.filter(pk__in=product_ids)
+        .annotate(available=F("stock") - held_quantity(exclude_cart))
+        .values_list("pk", "available")
+    )
+    return {pk: max(available, 0) for pk, available in rows}
+
+
+def reserve(cart, quantities, seconds=None):
+    """
+    Hold quantities[product_id] units for `cart`, replacing its earlier holds
+    on those products, and return the new expiry (None if nothing was held).
+
+    Raises ValidationError if any line exceeds what is available to sell.
+    """
+    seconds = seconds or settings.CART_HOLD_SECONDS
+    flash = flash_sale_ids(quantities)
+    if flash:
+        check_available({pk: quantities[pk] for pk in flash})
+        quantities = {pk: quantity for pk, quantity in quantities.items() if pk not in flash}
+        if not quantities:
+            return None
+    return run_with_lock_retry(_reserve, cart, quantities, seconds)
+
+
+def _reserve(cart, quantities, seconds):
+    # Locking the products serializes holds on them, so availability cannot
+    # change between the check and the write
+    products = lock_products(quantities)
+    available = available_to_sell(quantities, exclude_cart=cart)
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
+        if product is None:
+            raise ValidationError(f"Product unavailable: {product_id}")
+        if quantity > available[product_id]:
+            raise ValidationError(f"Not enough stock for {product.title}")
+
+    expires_at = timezone.now() + timedelta(seconds=seconds)
+    StockReservation.objects.bulk_create(
+        [
+            StockReservation(cart=cart, product_id=product_id, quantity=quantity, expires_at=expires_at)
+            for product_id, quantity in quantities.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["cart", "product"],
+        update_fields=["quantity", "expires_at"],
+    )
+    return expires_at
+
+
+def release(cart, product_ids=None):
+    """Drop the cart's holds (on the given products, or all of them)"""
+    holds = StockReservation.objects.filter(cart=cart)
+    if product_ids is not None:
+        holds = holds.filter(product_id__in=product_ids)
+    holds.delete()
+
+
+def covered_by_holds(cart, quantities):
+    """True if every line has an active hold of at least its quantity"""
+    held = dict(cart.reservations.active().values_list("product_id", "quantity"))
+    return all(held.get(product_id, 0) >= quantity for product_id, quantity in quantities.items())
+
+
+def sweep_expired(batch_size=1000):
+    """Delete expired holds a batch at a time, so no statement runs long; returns the count"""
+    swept = 0
+    while True:
+        batch = list(StockReservation.objects.expired().values_list("pk", flat=True)[:batch_size])
+        if not batch:
+            break
+        swept += StockReservation.objects.filter(pk__in=batch).delete()[0]
+        if len(batch) < batch_size:
+            break
+    return swept
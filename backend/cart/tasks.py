@@ -0,0 +1,15 @@
+from celery import shared_task
+from django.conf import settings
+import logging
+
+from .reservations import sweep_expired
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def sweep_expired_reservations_task():
+    swept = sweep_expired(settings.RESERVATION_SWEEP_BATCH_SIZE)
+    if swept:
+        logger.info(f"Swept {swept} expired stock reservations")
+    return swept
@@ -0,0 +1,57 @@
+import pytest
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from cart.models import Cart, CartItem, StockReservation
+from cart.reservations import available_to_sell, reserve, sweep_expired
+from orders.checkout import checkout_cart
+from products.models import Product
+
+User = get_user_model()
+
+
+def make_cart(username):
+    user = User.objects.create_user(username, f"{username}@test.com", "pass1234", role="customer")
+    return Cart.objects.create(user=user)
+
+
+@pytest.mark.django_db
+def test_holds_reduce_available_to_sell_until_they_expire():
+    vendor = User.objects.create_user("vendor", "vendor@test.com", "pass1234", role="vendor")
+    product = Product.objects.create(title="Drop", price=120, stock=3, vendor=vendor)
+    first, second = make_cart("first"), make_cart("second")
+
+    reserve(first, {product.id: 2})
+    assert available_to_sell([product.id], exclude_cart=second) == {product.id: 1}
+    with pytest.raises(ValidationError):
+        reserve(second, {product.id: 2})
+
+    # An expired hold stops counting at once; the sweep only tidies up
+    StockReservation.objects.filter(cart=first).update(expires_at=timezone.now() - timedelta(seconds=1))
+    reserve(second, {product.id: 2})
+    assert sweep_expired(batch_size=1) == 1
+    assert list(StockReservation.objects.values_list("cart_id", flat=True)) == [second.id]
+
+
+@pytest.mark.django_db
+def test_checkout_converts_holds_without_recomputing_availability():
+    vendor = User.objects.create_user("vendor", "vendor@test.com", "pass1234", role="vendor")
+    product = Product.objects.create(title="Drop", price=120, stock=3, vendor=vendor)
+    cart = make_cart("buyer")
+    CartItem.objects.create(cart=cart, product=product, quantity=2)
+    reserve(cart, {product.id: 2})
+
+    with CaptureQueriesContext(connection) as ctx:
+        order = checkout_cart(cart.user, cart)
+
+    queries = [query["sql"] for query in ctx.captured_queries]
+    # Rows are still locked in id order, but other carts' holds are not summed again
+    assert any("FOR UPDATE" in sql and "ORDER BY" in sql for sql in queries)
+    assert not any("SUM(" in sql for sql in queries)
+    product.refresh_from_db()
+    assert product.stock == 1
+    assert order.items.get().quantity == 2
+    assert not cart.reservations.exists()
@@ -2,8 +2,10 @@ from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
 from .models import Cart, CartItem
+from .reservations import release, reserve
 from .serializers import CartItemSerializer, CartSerializer
 from products.models import Product
 
@@ -39,20 +41,21 @@ class AddtoCartAPIView(generics.CreateAPIView):
 
         products = get_object_or_404(Product, is_active=True, id=product_id)
 
-        # Check product stock
-        if quantity > products.stock:
-            return Response({"error": "Not enough stock"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart_user,
-            product=products,
-            defaults={"quantity":quantity}
-        )
-
-        if not created:
-            new_quantity = cart_item.quantity + quantity
-            if new_quantity > products.stock:
-                return Response({"error": "Exceeds stock"}, status=status.HTTP_400_BAD_REQUEST)
+        cart_item = CartItem.objects.filter(cart=cart_user, product=products).first()
+        new_quantity = quantity + (cart_item.quantity if cart_item else 0)
+
+        # Hold the units against other carts' holds, not just raw stock. The
+        # hold commits on its own, so lock retries never back off inside an
+        # open transaction; a hold left without its line simply expires.
+        try:
+            reserve(cart_user, {products.id: new_quantity})
+        except ValidationError:
+            error = "Not enough stock" if cart_item is None else "Exceeds stock"
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        if cart_item is None:
+            cart_item = CartItem.objects.create(cart=cart_user, product=products, quantity=new_quantity)
+        else:
             cart_item.quantity = new_quantity
             cart_item.save()
 
@@ -77,15 +80,16 @@ class UpdateCartItemAPIView(generics.UpdateAPIView):
         cart_item = self.get_object()
 
         quantity = int(request.data.get("quantity", 1))
-        
-        # Check product stock
-        if quantity > cart_item.product.stock:
-            return Response({"error": "Exceeds stock"}, status=status.HTTP_400_BAD_REQUEST)
-        
+
         if quantity < 1:
+            release(cart_item.cart, [cart_item.product_id])
             cart_item.delete()
             return Response({"message": "Item removed"}, status=status.HTTP_204_NO_CONTENT)
-    
+
+        try:
+            reserve(cart_item.cart, {cart_item.product_id: quantity})
+        except ValidationError:
+            return Response({"error": "Exceeds stock"}, status=status.HTTP_400_BAD_REQUEST)
         cart_item.quantity = quantity
         cart_item.save()
 
@@ -105,6 +109,7 @@ class RemoveFromCartAPIView(generics.DestroyAPIView):
             return Response({"error": "Not your cart"}, status=status.HTTP_403_FORBIDDEN)
         
         cart = instance.cart
+        release(cart, [instance.product_id])
         instance.delete()
 
         cart_serializer = CartSerializer(cart, context={"request": self.request})
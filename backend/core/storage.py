@@ -0,0 +1,158 @@
+"""
+Content-addressed media storage.
+
+Files are stored once per distinct content under
+`cas/<aa>/<bb>/<sha256><ext>`. Rows that upload identical bytes share the
+stored file, and a file is deleted only when no tracked field references it
+any more. References are counted from the database on release rather than
+kept in a counter, so bulk writes cannot make the count drift. Saves and
+releases of the same name take a shared advisory lock, so a release cannot
+delete a file that a concurrent save has just found and reused.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils.deconstruct import deconstructible
+
+CAS_PREFIX = "cas"
+CAS_NAME = re.compile(rf"^{CAS_PREFIX}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/[0-9a-f]{{64}}(\.\w+)?$")
+
+# (model, field name) pairs whose files share the content-addressed pool
+_tracked_fields = []
+
+
+def lock_stored_name(name):
+    """Serialize saves and releases of one stored name until the transaction ends"""
+    key = int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], "big", signed=True)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [key])
+
+
+def is_content_addressed(name):
+    return bool(name) and bool(CAS_NAME.match(name))
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentHashPath:
+    """upload_to callable naming the upload after the sha256 of its bytes"""
+
+    def __init__(self, field_name):
+        self.field_name = field_name
+
+    def __call__(self, instance, filename):
+        digest = content_hash(getattr(instance, self.field_name).file)
+        ext = os.path.splitext(filename)[1].lower()
+        return posixpath.join(CAS_PREFIX, digest[:2], digest[2:4], f"{digest}{ext}")
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Stores content-addressed names at most once; other names behave as usual"""
+
+    def get_available_name(self, name, max_length=None):
+        if is_content_addressed(name):
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        if not is_content_addressed(name):
+            return super()._save(name, content)
+        with transaction.atomic():
+            # Inside the caller's transaction the lock is held until the row
+            # referencing the file commits, so a release cannot delete it first
+            lock_stored_name(name)
+            if self.exists(name):
+                return name
+            # Write under a private name and rename, so a concurrent upload of
+            # the same bytes can never observe a partial file
+            partial = super()._save(f"{name}.{uuid.uuid4().hex}.part", content)
+            os.replace(self.path(partial), self.path(name))
+        return name
+
+    def delete_derivatives(self, name):
+        """Delete the resized renditions of `name` (see products.images.derivative_name)"""
+        directory, filename = posixpath.split(name)
+        rendition = re.compile(rf"^{re.escape(posixpath.splitext(filename)[0])}-\d+w\.\w+$")
+        derivatives_dir = posixpath.join(directory, "derivatives")
+        if self.exists(derivatives_dir):
+            for derivative in self.listdir(derivatives_dir)[1]:
+                if rendition.match(derivative):
+                    self.delete(posixpath.join(derivatives_dir, derivative))
+
+    def delete_with_derivatives(self, name):
+        self.delete_derivatives(name)
+        self.delete(name)
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def reference_count(name):
+    return sum(
+        model._default_manager.filter(**{field_name: name}).count()
+        for model, field_name in _tracked_fields
+    )
+
+
+def release_file(storage, name):
+    """
+    Delete a content-addressed file after commit if nothing references it.
+
+    Files stored under other names predate the shared pool and are left in
+    place, but their renditions are dropped once nothing references them.
+    """
+    def _release():
+        with transaction.atomic():
+            # Count and delete under the lock a concurrent save of the same bytes takes
+            lock_stored_name(name)
+            if reference_count(name) != 0:
+                return
+            if is_content_addressed(name):
+                storage.delete_with_derivatives(name)
+            else:
+                storage.delete_derivatives(name)
+
+    transaction.on_commit(_release)
+
+
+def track_references(model, field_name):
+    """Release a field's previous file when a row replaces or drops it"""
+    if (model, field_name) not in _tracked_fields:
+        _tracked_fields.append((model, field_name))
+    attr = f"_{field_name}_stored_name"
+
+    def remember(sender, instance, **kwargs):
+        # Deferred fields are skipped rather than loaded
+        value = instance.__dict__.get(field_name)
+        setattr(instance, attr, getattr(value, "name", value) or None)
+
+    def saved(sender, instance, **kwargs):
+        previous = getattr(instance, attr, None)
+        current = getattr(instance, field_name).name
+        if previous and previous != current:
+            release_file(getattr(instance, field_name).storage, previous)
+        setattr(instance, attr, current)
+
+    def deleted(sender, instance, **kwargs):
+        file = getattr(instance, field_name)
+        if file:
+            release_file(file.storage, file.name)
+
+    uid = f"{model._meta.label}.{field_name}"
+    post_init.connect(remember, sender=model, weak=False, dispatch_uid=f"{uid}.remember")
+    post_save.connect(saved, sender=model, weak=False, dispatch_uid=f"{uid}.saved")
+    post_delete.connect(deleted, sender=model, weak=False, dispatch_uid=f"{uid}.deleted")
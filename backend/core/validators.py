@@ -0,0 +1,34 @@
+import warnings
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from PIL import Image, UnidentifiedImageError
+
+
+def read_image_header(upload):
+    """
+    Identify an uploaded image from its header without decoding pixel data.
+
+    Returns (format, width, height). Pixel counts above MAX_IMAGE_PIXELS are
+    rejected before anything (e.g. the derivative task) decodes the image.
+    The file position is restored.
+    """
+    max_pixels = getattr(settings, "MAX_IMAGE_PIXELS", Image.MAX_IMAGE_PIXELS)
+    position = upload.tell() if hasattr(upload, "tell") else None
+    try:
+        upload.seek(0)
+        with warnings.catch_warnings():
+            # We apply our own limit below; Pillow's bomb checks only warn or
+            # raise at fixed multiples of its global limit.
+            warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+            with Image.open(upload) as img:
+                fmt, (width, height) = img.format, img.size
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise ValidationError("Sorry, the file is not a valid image!")
+    finally:
+        if position is not None:
+            upload.seek(position)
+
+    if width * height > max_pixels:
+        raise ValidationError(f"Sorry, the image dimensions ({width}x{height}) are too large!")
+    return fmt, width, height
@@ -0,0 +1,144 @@
+"""
+Set-based checkout.
+
+A cart becomes an order in the same handful of statements whatever its size:
+the products are locked by one SELECT with their vendors' profiles joined,
+every line's stock is taken by one conditional UPDATE and the order items
+are written by one INSERT. Row locks are therefore held for a fixed number
+of round trips instead of a few per cart line. Lock ordering, bounded waits
+and retries live in orders.locking.
+
+When every line is covered by an active stock hold (cart.reservations), the
+units were already set aside for this cart, so availability is not worked
+out again: the rows are locked in the same order and with the same bound,
+and the holds are converted straight into the sale.
+
+Flash sale lines are admitted by the in-memory stock counter before the
+transaction starts (see orders.flash_sale) and take no part in either path.
+"""
+import logging
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from rest_framework.exceptions import ValidationError
+
+from cart.models import StockReservation
+from cart.reservations import available_to_sell, covered_by_holds
+from products.models import Product
+from products.signals import catalog_changed
+from .flash_sale import admit, flash_sale_ids, give_back
+from .locking import lock_products, run_with_lock_retry
+from .models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+CENTS = Decimal("0.01")
+
+
+def unit_price(product):
+    return Decimal(product.price).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def validate_lines(quantities, products, available):
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
+        if product is None:
+            logger.error(f"Product {product_id} not found during checkout")
+            raise ValidationError(f"Product unavailable: {product_id}")
+        if quantity <= 0:
+            logger.error(f"Invalid quantity {quantity} for product {product.title}")
+            raise ValidationError(f"Invalid quantity for {product.title}")
+        if available[product_id] < quantity:
+            logger.error(f"Insufficient stock for {product.title}: {available[product_id]} < {quantity}")
+            raise ValidationError(f"Not enough stock for {product.title}")
+
+
+def cart_quantities(cart):
+    quantities = dict(cart.cart_items.values_list("product_id", "quantity"))
+    if not quantities:
+        raise ValidationError("Cart is empty")
+    return quantities
+
+
+def checkout_cart(user, cart, payment_intent_id=None):
+    """Create a pending order from `cart`, take its stock and empty the cart"""
+    quantities = cart_quantities(cart)
+    flash = {pk: quantities[pk] for pk in flash_sale_ids(quantities)}
+    admit(flash)
+    try:
+        order = run_with_lock_retry(_place_reserved_order, user, cart, quantities, flash, payment_intent_id)
+        if order is None:
+            order = run_with_lock_retry(_place_order, user, cart, quantities, flash, payment_intent_id)
+    except Exception:
+        give_back(flash)
+        raise
+    return order
+
+
+def _place_reserved_order(user, cart, quantities, flash, payment_intent_id):
+    """Convert the cart's holds into a sale; returns None if any line is not fully held"""
+    regular = {pk: quantity for pk, quantity in quantities.items() if pk not in flash}
+    # Lines that need validating go through the locked path
+    if min(quantities.values()) <= 0 or not covered_by_holds(cart, regular):
+        return None
+
+    # Locking in id order first keeps the multi-row UPDATE from deadlocking
+    # against overlapping checkouts
+    products = lock_products(regular)
+    # The hold must still be live when the stock is taken, not just when it was read
+    still_held = StockReservation.objects.active().filter(cart=cart, product_id=OuterRef("pk"))
+    taken = Product.objects.filter(Exists(still_held)).decrement_stock(regular)
+    if taken != len(regular):
+        # A hold lapsed in between; undo this attempt and take the validating path
+        transaction.set_rollback(True)
+        return None
+
+    if flash:
+        products.update(Product.objects.select_related("vendor__vendor_profile").in_bulk(flash))
+    return _create_order(user, cart, quantities, flash, products, payment_intent_id)
+
+
+def _place_order(user, cart, quantities, flash, payment_intent_id):
+    regular = {pk: quantity for pk, quantity in quantities.items() if pk not in flash}
+    products = lock_products(regular)
+    validate_lines(regular, products, available_to_sell(regular, exclude_cart=cart))
+
+    if Product.objects.decrement_stock(regular) != len(regular):
+        # Unreachable while the rows are locked; kept as a guard
+        short = [products[pk].title for pk in regular if products[pk].stock < regular[pk]]
+        raise ValidationError(f"Not enough stock for {', '.join(short) or 'cart items'}")
+
+    if flash:
+        products.update(Product.objects.select_related("vendor__vendor_profile").in_bulk(flash))
+    return _create_order(user, cart, quantities, flash, products, payment_intent_id)
+
+
+def _create_order(user, cart, quantities, flash, products, payment_intent_id):
+    total = sum(
+        (unit_price(products[pk]) * quantity for pk, quantity in quantities.items()),
+        Decimal("0.00"),
+    )
+    order = Order.objects.create(
+        user=user,
+        status="pending",
+        total_amount=total.quantize(CENTS, rounding=ROUND_HALF_UP),
+        currency="USD",
+        stripe_payment_intent_id=payment_intent_id or None,
+    )
+    OrderItem.objects.bulk_create([
+        OrderItem(
+            order=order,
+            product=products[pk],
+            vendor=getattr(products[pk].vendor, "vendor_profile", None),
+            title_snapshot=products[pk].title,
+            unit_price=unit_price(products[pk]),
+            quantity=quantity,
+            stock_pending=pk in flash,
+        )
+        for pk, quantity in quantities.items()
+    ])
+    cart.cart_items.all().delete()
+    cart.reservations.all().delete()
+    catalog_changed(product_ids=[pk for pk in quantities if pk not in flash])
+    return order
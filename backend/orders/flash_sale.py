@@ -0,0 +1,277 @@
+"""
+Flash sale stock counters.
+
+Products with `flash_sale` set are sold through an atomic in-memory counter
+instead of their database row: checkout takes units from the counter (a Lua
+script in Redis, all or nothing across a cart's lines) and never locks
+products_product, so a drop with thousands of buyers is admitted or turned
+away in microseconds. The counters must be shared by every worker: without
+a configured store (FLASH_SALE_COUNTERS) flash sales cannot be switched on
+and their buyers are turned away with a 503.
+
+The database stays the source of truth. Order items for flash sale lines are
+written with `stock_pending` set, and a periodic task applies them to
+Product.stock in batches. At every moment
+
+    counter == Product.stock - units in stock_pending order items
+
+except for units admitted but not yet written to an order. A counter that
+is missing (Redis restarted or evicted it) is rebuilt from the database on
+first use, and one is built when the sale is switched on. A running counter
+is never reset, as that would hand out the admitted units again: restocks
+and corrections move it by their delta (products.stock announces them, as
+does a Product.save that changes stock), and a cancelled order gives its
+units back.
+"""
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from products.models import Product
+from products.signals import catalog_changed
+from .models import OrderItem
+
+# The hash tag keeps every counter in one Redis Cluster slot, as a cart's
+# counters are updated by a single script
+COUNTER_KEY = "orders:flash:{{stock}}:{}"
+
+# Results of take(): (outcome, product id it concerns)
+TAKEN, MISSING, SHORT = 0, 1, 2
+
+TAKE_SCRIPT = """
+for i, key in ipairs(KEYS) do
+    local left = redis.call('GET', key)
+    if not left then return {1, i} end
+    if tonumber(left) < tonumber(ARGV[i]) then return {2, i} end
+end
+for i, key in ipairs(KEYS) do
+    redis.call('DECRBY', key, ARGV[i])
+end
+return {0, 0}
+"""
+
+# Returning units to a counter that has gone is left to the rebuild
+GIVE_BACK_SCRIPT = """
+for i, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then redis.call('INCRBY', key, ARGV[i]) end
+end
+"""
+
+
+class FlashSaleUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Flash sale stock is unavailable right now. Please try again."
+    default_code = "flash_sale_unavailable"
+
+
+class RedisCounters:
+    def __init__(self, url=None):
+        import redis
+
+        self.client = redis.Redis.from_url(url or settings.REDIS_URL)
+        self._take = self.client.register_script(TAKE_SCRIPT)
+        self._give_back = self.client.register_script(GIVE_BACK_SCRIPT)
+
+    def take(self, quantities):
+        product_ids = list(quantities)
+        keys = [COUNTER_KEY.format(pk) for pk in product_ids]
+        outcome, index = self._take(keys=keys, args=[quantities[pk] for pk in product_ids])
+        return outcome, product_ids[index - 1] if index else None
+
+    def give_back(self, quantities):
+        product_ids = list(quantities)
+        self._give_back(
+            keys=[COUNTER_KEY.format(pk) for pk in product_ids],
+            args=[quantities[pk] for pk in product_ids],
+        )
+
+    def get_many(self, product_ids):
+        product_ids = list(product_ids)
+        values = self.client.mget([COUNTER_KEY.format(pk) for pk in product_ids])
+        return {pk: int(value) for pk, value in zip(product_ids, values) if value is not None}
+
+    def set_many(self, values, only_missing=False):
+        with self.client.pipeline() as pipe:
+            for pk, value in values.items():
+                pipe.set(COUNTER_KEY.format(pk), value, nx=only_missing)
+            pipe.execute()
+
+    def delete_many(self, product_ids):
+        keys = [COUNTER_KEY.format(pk) for pk in product_ids]
+        if keys:
+            self.client.delete(*keys)
+
+
+class LocalCounters:
+    """Per-process stand-in for RedisCounters, for tests and local development"""
+
+    def __init__(self):
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def take(self, quantities):
+        with self.lock:
+            for pk, quantity in quantities.items():
+                if pk not in self.values:
+                    return MISSING, pk
+                if self.values[pk] < quantity:
+                    return SHORT, pk
+            for pk, quantity in quantities.items():
+                self.values[pk] -= quantity
+            return TAKEN, None
+
+    def give_back(self, quantities):
+        with self.lock:
+            for pk, quantity in quantities.items():
+                if pk in self.values:
+                    self.values[pk] += quantity
+
+    def get_many(self, product_ids):
+        with self.lock:
+            return {pk: self.values[pk] for pk in product_ids if pk in self.values}
+
+    def set_many(self, values, only_missing=False):
+        with self.lock:
+            for pk, value in values.items():
+                if not only_missing or pk not in self.values:
+                    self.values[pk] = value
+
+    def delete_many(self, product_ids):
+        with self.lock:
+            for pk in product_ids:
+                self.values.pop(pk, None)
+
+
+_counters = None
+
+
+def enabled():
+    """False when no counter store is configured, in which case flash sales are refused"""
+    return _counters is not None or bool(settings.FLASH_SALE_COUNTERS)
+
+
+def counters():
+    global _counters
+    if _counters is None:
+        if not settings.FLASH_SALE_COUNTERS:
+            raise FlashSaleUnavailable()
+        _counters = import_string(settings.FLASH_SALE_COUNTERS)()
+    return _counters
+
+
+def flash_sale_ids(product_ids):
+    return set(Product.objects.filter(pk__in=product_ids, flash_sale=True).values_list("pk", flat=True))
+
+
+def counter_values(product_ids):
+    """What each flash sale product's counter should hold, from the database"""
+    pending = (
+        OrderItem.objects.filter(product_id=OuterRef("pk"), stock_pending=True)
+        .order_by()
+        .values("product_id")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+    rows = (
+        Product.objects.filter(pk__in=product_ids, flash_sale=True)
+        .annotate(sellable=F("stock") - Coalesce(Subquery(pending), Value(0)))
+        .values_list("pk", "sellable")
+    )
+    return {pk: max(sellable, 0) for pk, sellable in rows}
+
+
+def rebuild_counters(product_ids=None, only_missing=False):
+    """Reset counters from the database (all flash sale products by default)"""
+    if product_ids is None:
+        product_ids = Product.objects.filter(flash_sale=True).values_list("pk", flat=True)
+    values = counter_values(product_ids)
+    counters().set_many(values, only_missing=only_missing)
+    return values
+
+
+def available(product_ids):
+    """Units each flash sale product can still sell, rebuilding missing counters"""
+    store = counters()
+    values = store.get_many(product_ids)
+    missing = [pk for pk in product_ids if pk not in values]
+    if missing:
+        rebuild_counters(missing, only_missing=True)
+        values.update(store.get_many(missing))
+    return values
+
+
+def _sold_out(product_id):
+    title = Product.objects.filter(pk=product_id).values_list("title", flat=True).first()
+    return ValidationError(f"Not enough stock for {title or product_id}")
+
+
+def admit(quantities):
+    """Take a checkout's flash sale units from the counters, all or nothing"""
+    if not quantities:
+        return
+    if any(quantity <= 0 for quantity in quantities.values()):
+        raise ValidationError("Invalid quantity")
+    store = counters()
+    outcome, product_id = store.take(quantities)
+    if outcome == MISSING:
+        rebuild_counters(quantities, only_missing=True)
+        outcome, product_id = store.take(quantities)
+    if outcome == SHORT:
+        raise _sold_out(product_id)
+    if outcome == MISSING:
+        # Still missing straight after a rebuild: no longer a flash sale, or the store is failing
+        raise FlashSaleUnavailable()
+
+
+def give_back(quantities):
+    """Return units taken by admit() to the counters, e.g. when the checkout fails"""
+    if quantities and enabled():
+        counters().give_back(quantities)
+
+
+def shift_counters(deltas):
+    """Move existing counters by stock changes made outside checkout, e.g. a restock"""
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if deltas and enabled():
+        counters().give_back(deltas)
+
+
+def check_available(quantities):
+    """Raise ValidationError if a flash sale line asks for more than its counter holds"""
+    values = available(list(quantities))
+    for product_id, quantity in quantities.items():
+        if quantity > values.get(product_id, 0):
+            raise _sold_out(product_id)
+
+
+def reconcile_pending(batch_size=500):
+    """
+    Apply a batch of flash sale order items to Product.stock and return how
+    many were applied.
+
+    Rows locked by another reconciler are skipped, so concurrent runs split
+    the backlog instead of waiting on each other.
+    """
+    with transaction.atomic():
+        items = list(
+            OrderItem.objects.select_for_update(skip_locked=True)
+            .filter(stock_pending=True)
+            .order_by("pk")
+            .values_list("pk", "product_id", "quantity")[:batch_size]
+        )
+        if not items:
+            return 0
+        totals = {}
+        for _, product_id, quantity in items:
+            if product_id is not None:
+                totals[product_id] = totals.get(product_id, 0) + quantity
+        Product.objects.subtract_stock(totals)
+        OrderItem.objects.filter(pk__in=[pk for pk, _, _ in items]).update(stock_pending=False)
+        catalog_changed(product_ids=totals)
+    return len(items)
@@ -0,0 +1,83 @@
+"""
+Idempotency-Key support for order endpoints.
+
+A client that retries a POST with the same `Idempotency-Key` header gets the
+stored response of the first attempt instead of a second order or payment
+intent. Successful responses are kept in the shared cache for
+IDEMPOTENCY_KEY_TTL seconds, scoped to the user and the view. While the
+first attempt is still running, a retry is told so (409) rather than
+repeating the locking and stock work. Failed attempts are not stored, so a
+retry after an error runs again. Reusing a key for a different request body
+is rejected (422).
+"""
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+RESPONSE_KEY = "orders:idempotency:{}:{}:{}"
+IN_FLIGHT_KEY = "orders:idempotency:{}:{}:{}:in-flight"
+
+
+def _digest(value):
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def request_fingerprint(request):
+    data = request.data.dict() if hasattr(request.data, "dict") else request.data
+    return _digest(json.dumps(data, sort_keys=True, default=str))
+
+
+def idempotent(view_method):
+    """Replay the stored response for a repeated Idempotency-Key on this view method"""
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+        if not key.strip() or len(key) > MAX_KEY_LENGTH:
+            return Response({"error": f"Invalid {HEADER} header"}, status=status.HTTP_400_BAD_REQUEST)
+
+        scope = (request.user.pk, type(self).__name__, _digest(key))
+        response_key, in_flight_key = RESPONSE_KEY.format(*scope), IN_FLIGHT_KEY.format(*scope)
+        fingerprint = request_fingerprint(request)
+
+        stored = cache.get(response_key)
+        if stored is None and cache.add(in_flight_key, fingerprint, settings.IDEMPOTENCY_IN_FLIGHT_TIMEOUT):
+            try:
+                response = view_method(self, request, *args, **kwargs)
+                if status.is_success(response.status_code):
+                    cache.set(
+                        response_key,
+                        {"fingerprint": fingerprint, "status": response.status_code, "data": response.data},
+                        settings.IDEMPOTENCY_KEY_TTL,
+                    )
+            finally:
+                cache.delete(in_flight_key)
+            return response
+
+        if stored is None:
+            # Another attempt holds the key; it may have finished in the meantime
+            stored = cache.get(response_key)
+        if stored is None:
+            return Response(
+                {"error": f"A request with this {HEADER} is still in progress"},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if stored["fingerprint"] != fingerprint:
+            return Response(
+                {"error": f"This {HEADER} was already used for a different request"},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        response = Response(stored["data"], status=stored["status"])
+        response["Idempotent-Replayed"] = "true"
+        return response
+
+    return wrapper
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from orders.flash_sale import enabled, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the flash sale stock counters from the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing-only', action='store_true',
+            help='Only create counters that do not exist (safe while a sale is admitting buyers)',
+        )
+
+    def handle(self, *args, **options):
+        if not enabled():
+            raise CommandError('No flash sale counter store is configured (FLASH_SALE_COUNTERS).')
+        values = rebuild_counters(only_missing=options['missing_only'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(values)} flash sale counters.'))
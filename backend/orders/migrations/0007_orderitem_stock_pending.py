@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_alter_orderitem_quantity_and_more'),
+        ('products', '0022_product_flash_sale'),
+        ('users', '0008_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='stock_pending',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(condition=models.Q(('stock_pending', True)), fields=['product'], name='orderitem_stock_pending_idx'),
+        ),
+    ]
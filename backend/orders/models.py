@@ -32,6 +32,13 @@ class OrderItem(models.Model):
     title_snapshot = models.CharField(max_length=255, blank=True)
     unit_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     quantity = models.PositiveIntegerField(default=1)
+    # Flash sale lines are taken from the stock counter first and from Product.stock later, in batches
+    stock_pending = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["product"], condition=models.Q(stock_pending=True), name="orderitem_stock_pending_idx"),
+        ]
 
     def subtotal(self):
         if self.unit_price is None or self.quantity is None:
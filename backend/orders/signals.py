@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from products.models import Product
+from products.stock import flash_sale_stock_changed
+from .flash_sale import counters, enabled, rebuild_counters, shift_counters
+
+
+@receiver(post_save, sender=Product)
+def sync_flash_sale_counter(sender, instance, update_fields=None, **kwargs):
+    """
+    Build a product's counter when its flash sale starts and drop it when it ends.
+
+    While the sale runs the counter also accounts for units admitted but not
+    yet written to an order, so it is never reset from the database: a stock
+    edit moves it by the same amount instead.
+    """
+    if not enabled():
+        return
+    pk = instance.pk
+    was_flash_sale = getattr(instance, "_synced_flash_sale", False)
+    previous_stock = getattr(instance, "_synced_stock", None)
+    if instance.flash_sale and not was_flash_sale:
+        transaction.on_commit(lambda: rebuild_counters([pk], only_missing=True))
+    elif was_flash_sale and not instance.flash_sale:
+        transaction.on_commit(lambda: counters().delete_many([pk]))
+    elif (
+        instance.flash_sale
+        and previous_stock is not None
+        and (update_fields is None or "stock" in update_fields)
+    ):
+        delta = instance.stock - previous_stock
+        transaction.on_commit(lambda: shift_counters({pk: delta}))
+    instance._synced_flash_sale = instance.flash_sale
+    instance._synced_stock = instance.stock
+
+
+@receiver(flash_sale_stock_changed)
+def shift_flash_sale_counters(sender, deltas, **kwargs):
+    """Follow restocks and corrections written straight to the stock column"""
+    transaction.on_commit(lambda: shift_counters(deltas))
@@ -0,0 +1,22 @@
+from celery import shared_task
+from django.conf import settings
+import logging
+
+from .flash_sale import reconcile_pending
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def reconcile_flash_sales_task():
+    """Apply sold flash sale units to Product.stock until the backlog is drained"""
+    batch_size = settings.FLASH_SALE_RECONCILE_BATCH_SIZE
+    applied = 0
+    while True:
+        count = reconcile_pending(batch_size)
+        applied += count
+        if count < batch_size:
+            break
+    if applied:
+        logger.info(f"Applied {applied} flash sale order items to product stock")
+    return applied
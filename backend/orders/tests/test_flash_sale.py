@@ -0,0 +1,144 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+
+from cart.models import Cart, CartItem, StockReservation
+from cart.reservations import reserve
+from orders import flash_sale
+from orders.checkout import checkout_cart
+from orders.flash_sale import FlashSaleUnavailable, LocalCounters, counters, reconcile_pending
+from orders.models import OrderItem
+from products.models import Product, ProductSize, ProductVariant
+
+User = get_user_model()
+
+
+@override_settings(FLASH_SALE_COUNTERS="orders.flash_sale.LocalCounters")
+class FlashSaleTest(TestCase):
+    def setUp(self):
+        flash_sale._counters = LocalCounters()
+        self.vendor = User.objects.create_user(
+            username="vendor", email="vendor@example.com", password="testpass123", role="vendor"
+        )
+        self.product = Product.objects.create(
+            title="Limited Runner", price=Decimal("150.00"), stock=3, vendor=self.vendor, flash_sale=True
+        )
+
+    def tearDown(self):
+        flash_sale._counters = None
+
+    def cart_for(self, username, quantity):
+        user = User.objects.create_user(
+            username=username, email=f"{username}@example.com", password="testpass123", role="customer"
+        )
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=quantity)
+        return cart
+
+    def test_counter_admits_buyers_without_locking_the_product(self):
+        first, second = self.cart_for("first", 2), self.cart_for("second", 2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            order = checkout_cart(first.user, first)
+        self.assertFalse(any("FOR UPDATE" in query["sql"] for query in ctx.captured_queries))
+        self.assertTrue(order.items.get().stock_pending)
+        self.assertEqual(counters().get_many([self.product.pk]), {self.product.pk: 1})
+
+        with self.assertRaises(ValidationError):
+            checkout_cart(second.user, second)
+        self.assertEqual(counters().get_many([self.product.pk]), {self.product.pk: 1})
+
+        # The database catches up in a batch
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+        self.assertEqual(reconcile_pending(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+        self.assertFalse(OrderItem.objects.filter(stock_pending=True).exists())
+
+    def test_lost_counters_are_rebuilt_from_stock_and_pending_items(self):
+        cart = self.cart_for("first", 2)
+        checkout_cart(cart.user, cart)
+
+        # A restarted store comes back empty
+        flash_sale._counters = LocalCounters()
+        other = self.cart_for("second", 1)
+        reserve(other, {self.product.pk: 1})
+
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertEqual(counters().get_many([self.product.pk]), {self.product.pk: 1})
+        with self.assertRaises(ValidationError):
+            reserve(other, {self.product.pk: 2})
+
+    def test_edits_move_the_counter_instead_of_resetting_it(self):
+        flash_sale.admit({self.product.pk: 2})  # admitted, order not written yet
+        self.assertEqual(counters().get_many([self.product.pk]), {self.product.pk: 1})
+
+        product = Product.objects.get(pk=self.product.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.title = "Limited Runner II"
+            product.save()
+        self.assertEqual(counters().get_many([self.product.pk]), {self.product.pk: 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.stock = 5
+            product.save()
+        self.assertEqual(counters().get_many([self.product.pk]), {self.product.pk: 3})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.flash_sale = False
+            product.save()
+        self.assertEqual(counters().get_many([self.product.pk]), {})
+
+    def test_size_restock_moves_the_counter(self):
+        variant = ProductVariant.objects.create(product=self.product, color_name="Black")
+        size = ProductSize.objects.create(variant=variant, size_label="42", stock=3)
+        flash_sale.admit({self.product.pk: 2})
+        left = counters().get_many([self.product.pk])[self.product.pk]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            size.stock = 5
+            size.save()
+        self.assertEqual(counters().get_many([self.product.pk]), {self.product.pk: left + 2})
+
+    def test_cancelling_a_paid_order_gives_flash_sale_units_back(self):
+        cart = self.cart_for("first", 2)
+        order = checkout_cart(cart.user, cart)
+        order.status = "paid"
+        order.save()
+
+        client = APIClient()
+        client.force_authenticate(user=cart.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(f"/api/orders/{order.id}/cancel/")
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(counters().get_many([self.product.pk]), {self.product.pk: 3})
+        self.assertFalse(order.items.get().stock_pending)
+        self.assertEqual(reconcile_pending(), 0)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+
+    def test_flash_sales_are_refused_without_a_shared_store(self):
+        flash_sale._counters = None
+        cart = self.cart_for("first", 1)
+        with self.settings(FLASH_SALE_COUNTERS=None):
+            with self.assertRaises(FlashSaleUnavailable):
+                checkout_cart(cart.user, cart)
+            with self.assertRaises(DjangoValidationError):
+                Product.objects.create(title="Drop", price=Decimal("90.00"), vendor=self.vendor, flash_sale=True)
+
+    def test_checkout_endpoint_answers_503_without_a_shared_store(self):
+        flash_sale._counters = None
+        cart = self.cart_for("first", 1)
+        client = APIClient()
+        client.force_authenticate(user=cart.user)
+        with self.settings(FLASH_SALE_COUNTERS=None):
+            response = client.post("/api/orders/checkout/")
+        self.assertEqual(response.status_code, 503)
+        self.assertTrue(cart.cart_items.exists())
@@ -1,16 +1,24 @@
 import pytest
 import json
+import threading
 from unittest.mock import patch, MagicMock
 from decimal import Decimal
-from django.test import TestCase
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from django.urls import reverse
 
 from products.models import Product
 from cart.models import Cart, CartItem
+from orders.checkout import checkout_cart
+from orders.locking import LockContention, lock_metrics
 from orders.models import Order, OrderItem
+from users.models import VendorProfile
 
 User = get_user_model()
 
@@ -219,6 +227,143 @@ class OrderAPITest(TestCase):
         self.assertEqual(len(response.data), 1)
 
 
+
+class CheckoutEngineTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="testpass123", role="customer"
+        )
+        self.vendor = User.objects.create_user(
+            username="vendor", email="vendor@example.com", password="testpass123", role="vendor"
+        )
+        self.profile = VendorProfile.objects.create(user=self.vendor, shop_name="Kicks")
+
+    def fill_cart(self, lines):
+        cart = Cart.objects.create(user=self.user)
+        start = Product.objects.count()
+        for i in range(start, start + lines):
+            product = Product.objects.create(
+                title=f"Sneaker {i}", price=Decimal("10.00"), stock=5, vendor=self.vendor
+            )
+            CartItem.objects.create(cart=cart, product=product, quantity=2)
+        return cart
+
+    def checkout_queries(self, lines):
+        cart = self.fill_cart(lines)
+        with CaptureQueriesContext(connection) as ctx:
+            order = checkout_cart(self.user, cart)
+        cart.delete()
+        return order, len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        _, small = self.checkout_queries(2)
+        order, large = self.checkout_queries(15)
+
+        self.assertEqual(small, large)
+        self.assertEqual(order.total_amount, Decimal("300.00"))
+        self.assertEqual(order.items.count(), 15)
+        self.assertFalse(order.items.exclude(vendor=self.profile).exists())
+        self.assertFalse(Product.objects.filter(title__startswith="Sneaker").exclude(stock=3).exists())
+
+    def test_shortfall_rolls_back_every_line(self):
+        cart = self.fill_cart(3)
+        last = cart.cart_items.order_by("-id").first()
+        last.quantity = 6
+        last.save()
+
+        with self.assertRaises(ValidationError):
+            checkout_cart(self.user, cart)
+
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(Product.objects.exclude(stock=5).exists())
+        self.assertEqual(cart.cart_items.count(), 3)
+
+
+class CheckoutLockingTest(TransactionTestCase):
+    def test_contended_checkout_backs_off_then_gives_up(self):
+        user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="testpass123", role="customer"
+        )
+        product = Product.objects.create(title="Drop", price=Decimal("99.00"), stock=5, vendor=user)
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, product=product, quantity=1)
+
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            with transaction.atomic():
+                Product.objects.select_for_update().get(pk=product.pk)
+                locked.set()
+                release.wait(5)
+            connection.close()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        locked.wait(5)
+        before = lock_metrics()
+        try:
+            with self.settings(CHECKOUT_LOCK_TIMEOUT_MS=0, CHECKOUT_LOCK_ATTEMPTS=2, CHECKOUT_LOCK_BACKOFF_MS=1):
+                with self.assertRaises(LockContention):
+                    checkout_cart(user, cart)
+        finally:
+            release.set()
+            holder.join()
+        after = lock_metrics()
+
+        self.assertEqual(after["contended"] - before["contended"], 2)
+        self.assertEqual(after["retried"] - before["retried"], 1)
+        self.assertEqual(after["exhausted"] - before["exhausted"], 1)
+        self.assertFalse(Order.objects.exists())
+
+        # Once the lock is free the same checkout goes through
+        order = checkout_cart(user, cart)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 4)
+        self.assertEqual(order.items.get().quantity, 1)
+        self.assertEqual(lock_metrics()["acquired"] - after["acquired"], 1)
+
+
+class IdempotencyKeyTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="testpass123", role="customer"
+        )
+        self.product = Product.objects.create(
+            title="Test Product", price=Decimal("29.99"), stock=10, vendor=self.user
+        )
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+        self.client.force_authenticate(user=self.user)
+
+    def test_retried_checkout_replays_the_first_order(self):
+        first = self.client.post("/api/orders/checkout/", HTTP_IDEMPOTENCY_KEY="abc-123")
+        retry = self.client.post("/api/orders/checkout/", HTTP_IDEMPOTENCY_KEY="abc-123")
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data["id"], first.data["id"])
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 8)
+
+        reused = self.client.post(
+            "/api/orders/checkout/", {"payment_intent_id": "pi_other"}, HTTP_IDEMPOTENCY_KEY="abc-123"
+        )
+        self.assertEqual(reused.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_payment_intent_key_is_passed_to_stripe(self):
+        with patch("orders.views.stripe.PaymentIntent.create") as mock_create:
+            mock_create.return_value = {"id": "pi_test123", "client_secret": "pi_test123_secret"}
+            self.client.post("/api/orders/create-payment-intent/", HTTP_IDEMPOTENCY_KEY="pay-1")
+            self.client.post("/api/orders/create-payment-intent/", HTTP_IDEMPOTENCY_KEY="pay-1")
+
+        mock_create.assert_called_once()
+        self.assertEqual(mock_create.call_args.kwargs["idempotency_key"], f"payment-intent:{self.user.id}:pay-1")
+
+
 class StripeWebhookTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
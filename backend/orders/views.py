@@ -18,10 +18,16 @@ from django.http import HttpResponse
 
 logger = logging.getLogger(__name__)
 
-from .models import Order, OrderItem
+from .checkout import checkout_cart
+from .flash_sale import FlashSaleUnavailable, give_back
+from .idempotency import HEADER as IDEMPOTENCY_HEADER, idempotent
+from .locking import LockContention
+from .models import Order
 from .serializers import OrderSerializer, AdminOrderUpdateSerializer
 from cart.models import Cart
+from cart.reservations import reserve
 from products.models import Product
+from products.signals import catalog_changed
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
@@ -29,6 +35,7 @@ stripe.api_key = settings.STRIPE_SECRET_KEY
 class CreatePaymentIntentAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         user = request.user
 
@@ -41,23 +48,33 @@ class CreatePaymentIntentAPIView(APIView):
         if not cart_items_qs.exists():
             return Response({"error": "Cart is empty"}, status=status.HTTP_400_BAD_REQUEST)
 
-        running_total = Decimal("0.00")
-        for ci in cart_items_qs:
-            product = ci.product
-            if ci.quantity <= 0 or product.stock < ci.quantity:
-                raise ValidationError(f"Invalid quantity or stock for {product.title}")
+        cart_items = list(cart_items_qs)
+        for ci in cart_items:
+            if ci.quantity <= 0:
+                raise ValidationError(f"Invalid quantity or stock for {ci.product.title}")
+
+        # Re-check availability and hold every line for the length of the payment
+        reserve(cart, {ci.product_id: ci.quantity for ci in cart_items}, settings.PAYMENT_HOLD_SECONDS)
 
-            unit_price = Decimal(product.price).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        running_total = Decimal("0.00")
+        for ci in cart_items:
+            unit_price = Decimal(ci.product.price).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
             running_total += unit_price * ci.quantity
 
         total_cents = int(running_total * 100)
 
+        # Stripe dedupes on its side too, should our stored response be gone
+        request_options = {}
+        if request.headers.get(IDEMPOTENCY_HEADER):
+            request_options["idempotency_key"] = f"payment-intent:{user.id}:{request.headers[IDEMPOTENCY_HEADER]}"
+
         try:
             intent = stripe.PaymentIntent.create(
                 amount=total_cents,
                 currency="usd",
                 metadata={"user_id": user.id},
                 automatic_payment_methods={"enabled": True},
+                **request_options,
             )
         except stripe.error.StripeError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -153,6 +170,7 @@ class CheckoutAPIView(generics.CreateAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         user = request.user
         logger.info(f"Starting checkout process for user {user.id}")
@@ -166,83 +184,22 @@ class CheckoutAPIView(generics.CreateAPIView):
             logger.warning(f"Cart not found for user {user.id}")
             return Response({"error": "Cart is empty"}, status=status.HTTP_400_BAD_REQUEST)
 
-        cart_items_qs = cart.cart_items.select_related("product")
-        if not cart_items_qs.exists():
+        if not cart.cart_items.exists():
             logger.warning(f"Empty cart for user {user.id}")
             return Response({"error": "Cart is empty"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            with transaction.atomic():
-                product_ids = list(cart_items_qs.values_list("product_id", flat=True))
-                products_map = {
-                    p.id: p
-                    for p in Product.objects.select_for_update().filter(id__in=product_ids)
-                }
-
-                # Validate stock
-                for ci in cart_items_qs:
-                    product = products_map.get(ci.product_id)
-                    if product is None:
-                        logger.error(f"Product {ci.product_id} not found during checkout")
-                        raise ValidationError(f"Product unavailable: {ci.product_id}")
-                    if ci.quantity <= 0:
-                        logger.error(f"Invalid quantity {ci.quantity} for product {product.title}")
-                        raise ValidationError(f"Invalid quantity for {product.title}")
-                    if product.stock < ci.quantity:
-                        logger.error(f"Insufficient stock for {product.title}: {product.stock} < {ci.quantity}")
-                        raise ValidationError(f"Not enough stock for {product.title}")
-
-                order = Order.objects.create(
-                    user=user,
-                    status="pending", 
-                    total_amount=Decimal("0.00"),
-                    currency="USD",
-                )
-
-                if payment_intent_id:
-                    order.stripe_payment_intent_id = payment_intent_id
-                    order.save(update_fields=["stripe_payment_intent_id"])
-
-                running_total = Decimal("0.00")
-
-                # Add items & reduce stock
-                for ci in cart_items_qs:
-                    product = products_map[ci.product_id]
-
-                    updated = Product.objects.filter(
-                        id=product.id,
-                        stock__gte=ci.quantity
-                    ).update(stock=F("stock") - ci.quantity)
-
-                    if updated == 0:
-                        logger.error(f"Stock update failed for {product.title}")
-                        raise ValidationError(f"Not enough stock for {product.title}")
-
-                    unit_price = Decimal(product.price).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-                    # Get vendor profile if it exists
-                    vendor_profile = None
-                    if hasattr(product.vendor, 'vendor_profile'):
-                        vendor_profile = product.vendor.vendor_profile
-                    
-                    OrderItem.objects.create(
-                        order=order,
-                        product=product,
-                        vendor=vendor_profile,
-                        title_snapshot=product.title,
-                        unit_price=unit_price,
-                        quantity=ci.quantity,
-                    )
-                    running_total += unit_price * ci.quantity
-
-                order.total_amount = running_total.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-                order.save(update_fields=["total_amount", "updated_at"])
-
-                cart.cart_items.all().delete()
-                logger.info(f"Order {order.id} created successfully for user {user.id}")
-
+            order = checkout_cart(user, cart, payment_intent_id)
+            logger.info(f"Order {order.id} created successfully for user {user.id}")
         except ValidationError as e:
             logger.error(f"Validation error during checkout for user {user.id}: {e}")
             raise
+        except LockContention:
+            logger.warning(f"Checkout for user {user.id} gave up waiting for product locks")
+            raise
+        except FlashSaleUnavailable:
+            logger.warning(f"Checkout for user {user.id} could not reach the flash sale counters")
+            raise
         except Exception as e:
             logger.error(f"Unexpected error during checkout for user {user.id}: {e}")
             return Response(
@@ -318,12 +275,26 @@ class CancelOrderAPIView(APIView):
         with transaction.atomic():
             # Restore stock if order was paid
             if order.status == "paid":
-                for item in order.items.all():
-                    if item.product:
+                restored, returned = [], {}
+                items = order.items.select_for_update(of=("self",)).select_related("product")
+                for item in items:
+                    if not item.product:
+                        continue
+                    if item.stock_pending:
+                        # Never taken from Product.stock; just keep the reconciler from taking it
+                        item.stock_pending = False
+                        item.save(update_fields=["stock_pending"])
+                    else:
                         Product.objects.filter(id=item.product.id).update(
                             stock=F("stock") + item.quantity
                         )
-                        logger.info(f"Restored {item.quantity} units of {item.product.title} to stock")
+                        restored.append(item.product_id)
+                    if item.product.flash_sale:
+                        returned[item.product_id] = returned.get(item.product_id, 0) + item.quantity
+                    logger.info(f"Restored {item.quantity} units of {item.product.title} to stock")
+                # Stock is part of the product's representation and ETag
+                catalog_changed(product_ids=restored)
+                transaction.on_commit(lambda: give_back(returned))
 
             order.status = "canceled"
             order.save()
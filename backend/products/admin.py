@@ -22,13 +22,12 @@ from .models import (
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ["name", "slug", "product_count"]
+    list_display = ["name", "slug", "parent", "active_product_count"]
+    list_select_related = ["parent"]
+    readonly_fields = ["active_product_count"]
+    ordering = ["path"]
     prepopulated_fields = {"slug": ("name",)}
 
-    def product_count(self, obj):
-        return obj.products.count()
-    product_count.short_description = "Products"
-
 
 class ProductImageInline(NestedTabularInline):
     model = ProductImage
@@ -98,7 +97,7 @@ class ProductMediaSectionInline(NestedStackedInline):
 class ProductAdmin(NestedModelAdmin): 
     inlines = [ProductVariantInline, ProductMediaSectionInline]
     list_display = ("title", "base_price", "category", "vendor", "is_active", "image_count", "main_image_preview")
-    list_filter = ("category", "is_active", "created_at")
+    list_filter = ("category", "is_active", "flash_sale", "created_at")
     search_fields = ("title", "description")
     readonly_fields = ("created_at", "updated_at", "main_image_preview", "all_images_preview")
     prepopulated_fields = {"slug": ("title",)}
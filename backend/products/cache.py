@@ -0,0 +1,241 @@
+import hashlib
+import json
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+LIST_VERSION_KEY = "products:list:version"
+CATEGORY_VERSION_KEY = "products:categories:version"
+# Categories change rarely and every write bumps the version, so keep them long
+CATEGORY_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _timeout():
+    return getattr(settings, "PRODUCT_CACHE_TIMEOUT", 300)
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def list_version():
+    """Generation counter shared by every cached list page"""
+    return _version(LIST_VERSION_KEY)
+
+
+def list_cache_key(request):
+    params = urlencode(sorted(request.query_params.lists()), doseq=True)
+    digest = hashlib.sha256(f"{request.get_host()}?{params}".encode("utf-8")).hexdigest()
+    return f"products:list:v{list_version()}:{digest}"
+
+
+# Query parameters that change the result set (not just its page or shape)
+NON_FILTER_PARAMS = {"page", "page_size", "cursor", "pagination", "ordering", "view"}
+
+
+def facets_cache_key(request):
+    """Facets depend only on the filter/search signature, not on paging or ordering"""
+    params = urlencode(
+        sorted((key, values) for key, values in request.query_params.lists() if key not in NON_FILTER_PARAMS),
+        doseq=True,
+    )
+    digest = hashlib.sha256(params.encode("utf-8")).hexdigest()
+    return f"products:facets:v{list_version()}:{digest}"
+
+
+def detail_cache_key(slug):
+    return f"products:detail:{slug}"
+
+
+def batch_cache_key(pk):
+    return f"products:batch:{pk}"
+
+
+def invalidate_products(product_ids=None, slugs=None):
+    """
+    Drop cached responses for the given products once the transaction commits.
+
+    Every list page is invalidated by bumping the list generation; detail
+    entries are deleted per slug and batch entries per id.
+    """
+    product_ids = set(product_ids or [])
+    slugs = set(slugs or [])
+
+    def _invalidate():
+        ids, keys = set(product_ids), set(slugs)
+        if ids or keys:
+            from .models import Product
+            for pk, slug in Product.objects.filter(Q(pk__in=ids) | Q(slug__in=keys)).values_list("pk", "slug"):
+                ids.add(pk)
+                keys.add(slug)
+        _bump(LIST_VERSION_KEY)
+        stale = [detail_cache_key(slug) for slug in keys] + [batch_cache_key(pk) for pk in ids]
+        if stale:
+            cache.delete_many(stale)
+
+    transaction.on_commit(_invalidate)
+
+
+def category_cache_key(request):
+    params = urlencode(sorted(request.query_params.lists()), doseq=True)
+    digest = hashlib.sha256(f"{request.get_host()}?{params}".encode("utf-8")).hexdigest()
+    return f"products:categories:v{_version(CATEGORY_VERSION_KEY)}:{digest}"
+
+
+def invalidate_categories():
+    """Drop every cached category list once the transaction commits"""
+    transaction.on_commit(lambda: _bump(CATEGORY_VERSION_KEY))
+
+
+class CachedListMixin:
+    """Serve list responses from the cache, keyed on host and full query string"""
+
+    def list(self, request, *args, **kwargs):
+        key = list_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, _timeout())
+        return response
+
+
+class CachedFacetsMixin:
+    """Serve facet responses from the cache, keyed on the filter signature"""
+
+    def get(self, request, *args, **kwargs):
+        key = facets_cache_key(request)
+        data = cache.get(key)
+        if data is None:
+            data = self.get_facets()
+            cache.set(key, data, _timeout())
+        return Response(data)
+
+
+class CachedRetrieveMixin:
+    """
+    Serve detail responses from the cache, one key per slug, with validators.
+
+    The entry maps request host to data, because image URLs are absolute,
+    so a single delete invalidates the slug for every host. Each host entry
+    also carries the ETag and Last-Modified derived from Product.updated_at,
+    which child-row changes bump (see products.signals). A conditional GET
+    is answered with 304 from the cache entry, or after one indexed lookup
+    when the entry is cold, without serializing or prefetching anything.
+    """
+
+    def get_validators(self, request, **kwargs):
+        lookup = {self.lookup_field: kwargs[self.lookup_field]}
+        row = self.get_queryset().prefetch_related(None).filter(**lookup).values_list("pk", "updated_at").first()
+        if row is None:
+            return None
+        pk, updated_at = row
+        digest = hashlib.sha256(f"{pk}:{updated_at.isoformat()}:{request.get_host()}".encode("utf-8"))
+        return {"etag": quote_etag(digest.hexdigest()[:32]), "last_modified": int(updated_at.timestamp())}
+
+    def retrieve(self, request, *args, **kwargs):
+        key = detail_cache_key(kwargs[self.lookup_field])
+        host = request.get_host()
+        entry = cache.get(key) or {}
+        cached = entry.get(host)
+        validators = cached["validators"] if cached else self.get_validators(request, **kwargs)
+
+        response = None
+        if validators:
+            response = get_conditional_response(request, **validators)
+        if response is None and cached:
+            response = Response(cached["data"])
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+            if response.status_code == 200 and validators:
+                entry[host] = {"data": response.data, "validators": validators}
+                cache.set(key, entry, _timeout())
+
+        if validators:
+            response["ETag"] = validators["etag"]
+            response["Last-Modified"] = http_date(validators["last_modified"])
+        return response
+
+
+def _if_none_match(request):
+    header = request.headers.get("If-None-Match", "")
+    return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+
+class CachedETagListMixin:
+    """
+    Serve category lists from a long-lived cache with a strong ETag.
+
+    A matching If-None-Match is answered with 304 straight from the cache
+    entry, without serializing or querying anything.
+    """
+
+    def list(self, request, *args, **kwargs):
+        key = category_cache_key(request)
+        entry = cache.get(key)
+        if entry is None:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            body = json.dumps(response.data, sort_keys=True, cls=DjangoJSONEncoder)
+            entry = {"data": response.data, "etag": f'"{hashlib.sha256(body.encode("utf-8")).hexdigest()}"'}
+            cache.set(key, entry, CATEGORY_CACHE_TIMEOUT)
+
+        if entry["etag"] in _if_none_match(request):
+            response = Response(status=304)
+        else:
+            response = Response(entry["data"])
+        response["ETag"] = entry["etag"]
+        return response
+
+
+class CachedBatchMixin:
+    """
+    Serve many products by id, reading each one's cached representation first.
+
+    Entries are per product id and map request host to data, like detail
+    entries. Only the misses are loaded, with one query plus prefetches.
+    """
+
+    def get_batch(self, request, ids):
+        host = request.get_host()
+        entries = cache.get_many([batch_cache_key(pk) for pk in ids])
+        found = {}
+        for pk in ids:
+            data = entries.get(batch_cache_key(pk), {}).get(host)
+            if data is not None:
+                found[pk] = data
+
+        missing = [pk for pk in ids if pk not in found]
+        if missing:
+            products = list(self.get_queryset().filter(pk__in=missing))
+            fresh = {}
+            for product, data in zip(products, self.get_serializer(products, many=True).data):
+                found[product.pk] = data
+                entry = entries.get(batch_cache_key(product.pk), {})
+                entry[host] = data
+                fresh[batch_cache_key(product.pk)] = entry
+            cache.set_many(fresh, _timeout())
+
+        # Requested order; unknown and inactive ids are left out
+        return [found[pk] for pk in ids if pk in found]
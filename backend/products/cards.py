@@ -0,0 +1,64 @@
+from django.db.models import Prefetch
+
+from .images import rendition_url
+from .models import Product, ProductCard, ProductImage, ProductSize, ProductVariant
+
+THUMBNAIL_WIDTH = 640
+CARD_FIELDS = ["min_price", "max_price", "thumbnail_url", "colors", "sizes", "in_stock", "updated_at"]
+
+
+def build_card(product):
+    """
+    Compute the card document from a product with variants, images and sizes
+    prefetched. The price range is the stored min/max_effective_price.
+    """
+    colors = []
+    sizes = []
+    thumbnail_url = ""
+    in_stock = False
+
+    for variant in product.variants.all():
+        colors.append({"name": variant.color_name, "hex": variant.hex_code})
+
+        if not thumbnail_url:
+            first_image = next((img for img in variant.images.all() if img.image), None)
+            if first_image:
+                thumbnail_url = rendition_url(first_image.image, THUMBNAIL_WIDTH)
+
+        for size in variant.sizes.all():
+            if size.stock > 0:
+                in_stock = True
+                if size.size_label not in sizes:
+                    sizes.append(size.size_label)
+
+    return ProductCard(
+        product=product,
+        min_price=product.min_effective_price,
+        max_price=product.max_effective_price,
+        thumbnail_url=thumbnail_url,
+        colors=colors,
+        sizes=sizes,
+        in_stock=in_stock or product.stock > 0,
+    )
+
+
+def rebuild_product_cards(product_ids):
+    """Recompute and upsert the cards for the given products in a few queries"""
+    product_ids = {pk for pk in product_ids if pk is not None}
+    if not product_ids:
+        return 0
+
+    products = Product.objects.filter(pk__in=product_ids).prefetch_related(
+        Prefetch("variants", queryset=ProductVariant.objects.order_by("id")),
+        Prefetch("variants__images", queryset=ProductImage.objects.order_by("id")),
+        Prefetch("variants__sizes", queryset=ProductSize.objects.order_by("id")),
+    )
+    cards = [build_card(product) for product in products]
+    ProductCard.objects.bulk_create(
+        cards,
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=CARD_FIELDS,
+    )
+    return len(cards)
+
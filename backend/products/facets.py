@@ -0,0 +1,75 @@
+"""
+Catalog facet counts computed in a single aggregate query.
+
+The filtered product queryset is embedded as a subquery and joined to its
+categories, variants and in-stock sizes; GROUPING SETS then yields the
+distinct product count per category, color, size label and price bucket,
+plus the overall total, in one round trip.
+"""
+from django.db import connection
+
+from .models import Category, Product, ProductSize, ProductVariant
+
+# Upper bounds of the price buckets; the last bucket is open-ended
+PRICE_BUCKETS = [25, 50, 100, 200, 500]
+
+# GROUPING() bitmask over (category, color, size, bucket) identifying each set
+_CATEGORY, _COLOR, _SIZE, _PRICE, _TOTAL = 0b0111, 0b1011, 0b1101, 0b1110, 0b1111
+
+
+def _facet_sql(product_sql):
+    bounds = ", ".join(str(bound) for bound in PRICE_BUCKETS)
+    return f"""
+        WITH facet_rows AS (
+            SELECT
+                p.id AS product_id,
+                c.slug AS category_slug,
+                c.name AS category_name,
+                v.color_name AS color,
+                s.size_label AS size,
+                width_bucket(COALESCE(p.price, p.base_price), ARRAY[{bounds}]::numeric[]) AS bucket
+            FROM {Product._meta.db_table} p
+            LEFT JOIN {Category._meta.db_table} c ON c.id = p.category_id
+            LEFT JOIN {ProductVariant._meta.db_table} v ON v.product_id = p.id
+            LEFT JOIN {ProductSize._meta.db_table} s ON s.variant_id = v.id AND s.stock > 0
+            WHERE p.id IN ({product_sql})
+        )
+        SELECT
+            GROUPING(category_slug, color, size, bucket),
+            category_slug, MIN(category_name), color, size, bucket,
+            COUNT(DISTINCT product_id)
+        FROM facet_rows
+        GROUP BY GROUPING SETS ((category_slug), (color), (size), (bucket), ())
+    """
+
+
+def _price_range(bucket):
+    low = PRICE_BUCKETS[bucket - 1] if bucket > 0 else 0
+    high = PRICE_BUCKETS[bucket] if bucket < len(PRICE_BUCKETS) else None
+    return {"min": low, "max": high}
+
+
+def compute_facets(queryset):
+    """Facet counts for the products in `queryset` (already filtered)"""
+    product_sql, params = queryset.order_by().values("pk").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(_facet_sql(product_sql), params)
+        rows = cursor.fetchall()
+
+    facets = {"total": 0, "categories": [], "colors": [], "sizes": [], "price_ranges": []}
+    for grouping, slug, name, color, size, bucket, count in rows:
+        if grouping == _TOTAL:
+            facets["total"] = count
+        elif grouping == _CATEGORY and slug is not None:
+            facets["categories"].append({"slug": slug, "name": name, "count": count})
+        elif grouping == _COLOR and color is not None:
+            facets["colors"].append({"value": color, "count": count})
+        elif grouping == _SIZE and size is not None:
+            facets["sizes"].append({"value": size, "count": count})
+        elif grouping == _PRICE and bucket is not None:
+            facets["price_ranges"].append(dict(_price_range(bucket), count=count))
+
+    for key in ("categories", "colors", "sizes"):
+        facets[key].sort(key=lambda facet: (-facet["count"], facet.get("value") or facet.get("slug")))
+    facets["price_ranges"].sort(key=lambda facet: facet["min"])
+    return facets
@@ -0,0 +1,90 @@
+"""
+Sparse fieldsets for the public product list.
+
+`?fields=id,title,slug` limits the top-level fields in the output and
+`?expand=category,variants.sizes` chooses which relations are nested.
+Without `?expand=` every relation is nested, as before. A relation that is
+not expanded is rendered as its id (category) or left out (variants, and
+images/sizes inside variants). The view uses the same Fieldset to load only
+the needed columns and prefetch only the expanded relations.
+"""
+from rest_framework.exceptions import ValidationError
+
+EXPANDABLE = ("category", "variants", "variants.images", "variants.sizes")
+
+# Columns each output field needs, beyond the ones always loaded
+FIELD_COLUMNS = {
+    "category": ["category"],
+    "vendor_name": ["vendor__username"],
+    "variants": [],
+}
+# Always loaded: lookups, cache invalidation and keyset cursors read these
+BASE_COLUMNS = ["id", "slug", "created_at", "base_price", "min_effective_price"]
+
+
+def _split(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+class Fieldset:
+    def __init__(self, available, fields=None, expand=None):
+        self.available = list(available)
+        self.fields = fields
+        self.expand = set(EXPANDABLE) if expand is None else set(expand)
+
+    @classmethod
+    def from_request(cls, request, available):
+        params = request.query_params
+        fields = _split(params["fields"]) if "fields" in params else None
+        expand = _split(params["expand"]) if "expand" in params else None
+
+        errors = {}
+        unknown = set(fields or ()) - set(available)
+        if unknown:
+            errors["fields"] = [f"Unknown field: {name}" for name in sorted(unknown)]
+        unknown = set(expand or ()) - set(EXPANDABLE)
+        if unknown:
+            errors["expand"] = [f"Cannot expand: {name}" for name in sorted(unknown)]
+        if errors:
+            raise ValidationError(errors)
+
+        # Expanding a nested relation implies expanding its parent
+        if expand is not None:
+            expand = set(expand) | {path.split(".")[0] for path in expand}
+        return cls(available, fields, expand)
+
+    def wants(self, name):
+        return self.fields is None or name in self.fields
+
+    def expands(self, path):
+        return self.wants(path.split(".")[0]) and path in self.expand
+
+    def output_fields(self):
+        return [
+            name for name in self.available
+            if self.wants(name) and (name != "variants" or self.expands("variants"))
+        ]
+
+    def columns(self):
+        """Model columns for QuerySet.only()"""
+        columns = list(BASE_COLUMNS)
+        for name in self.output_fields():
+            columns.extend(FIELD_COLUMNS.get(name, [name]))
+        return list(dict.fromkeys(columns))
+
+    def select_related(self):
+        related = []
+        if self.expands("category"):
+            related.append("category")
+        if self.wants("vendor_name"):
+            related.append("vendor")
+        return related
+
+    def prefetch_related(self):
+        if not self.expands("variants"):
+            return []
+        return ["variants"] + [
+            f"variants__{path.split('.')[1]}"
+            for path in ("variants.images", "variants.sizes")
+            if self.expands(path)
+        ]
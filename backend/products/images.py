@@ -0,0 +1,114 @@
+"""
+Responsive image derivatives for ProductImage and ProductMediaItem.
+
+Derivatives are generated off the request path by a Celery task. Their
+metadata is stored on the row's `derivatives` JSON field, so serializers
+can build srcset maps without touching storage:
+
+    {
+        "source": "<original storage name>",
+        "width": 2400, "height": 1600,
+        "formats": {"webp": [{"width": 320, "height": 213, "name": "..."}, ...], ...}
+    }
+"""
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, features
+
+DERIVATIVE_WIDTHS = (320, 640, 1024, 1600)
+DERIVATIVE_FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "avif": {"format": "AVIF", "quality": 60},
+}
+
+
+def supported_formats():
+    return [fmt for fmt in DERIVATIVE_FORMATS if features.check(fmt)]
+
+
+def needs_derivatives(field_file):
+    instance = field_file.instance
+    return bool(field_file) and (instance.derivatives or {}).get("source") != field_file.name
+
+
+def derivative_name(source_name, width, fmt):
+    directory, filename = posixpath.split(source_name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, "derivatives", f"{stem}-{width}w.{fmt}")
+
+
+def generate_derivatives(field_file):
+    """Render every width/format pair for an image and return the metadata dict"""
+    storage = field_file.storage
+    with field_file.open("rb") as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    # Never upscale: widths above the original collapse into the original width
+    widths = sorted({min(width, image.width) for width in DERIVATIVE_WIDTHS})
+    formats = {}
+    for fmt in supported_formats():
+        options = dict(DERIVATIVE_FORMATS[fmt])
+        pil_format = options.pop("format")
+        renditions = []
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            buffer = BytesIO()
+            resized.save(buffer, format=pil_format, **options)
+            name = derivative_name(field_file.name, width, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+            name = storage.save(name, ContentFile(buffer.getvalue()))
+            renditions.append({"width": width, "height": height, "name": name})
+        formats[fmt] = renditions
+
+    return {
+        "source": field_file.name,
+        "width": image.width,
+        "height": image.height,
+        "formats": formats,
+    }
+
+
+def srcset_map(field_file, request=None):
+    """{format: "url 320w, url 640w, ..."} from stored metadata, or {} if not generated yet"""
+    derivatives = field_file.instance.derivatives or {}
+    if not field_file or derivatives.get("source") != field_file.name:
+        return {}
+
+    def url(name):
+        path = field_file.storage.url(name)
+        return request.build_absolute_uri(path) if request else path
+
+    return {
+        fmt: ", ".join(f"{url(r['name'])} {r['width']}w" for r in renditions)
+        for fmt, renditions in derivatives.get("formats", {}).items()
+    }
+
+
+def rendition_url(field_file, width, fmt="webp"):
+    """URL of the smallest derivative at least `width` wide, falling back to the original"""
+    derivatives = field_file.instance.derivatives or {}
+    renditions = derivatives.get("formats", {}).get(fmt)
+    if not renditions or derivatives.get("source") != field_file.name:
+        return field_file.url
+    fitting = [r for r in renditions if r["width"] >= width] or renditions[-1:]
+    return field_file.storage.url(fitting[0]["name"])
+
+
+def enqueue_derivatives(objs):
+    """Queue derivative generation for saved image rows once the transaction commits"""
+    from .tasks import generate_image_derivatives_task
+
+    jobs = [(obj._meta.label, obj.pk) for obj in objs if obj.pk and needs_derivatives(obj.image)]
+    if jobs:
+        transaction.on_commit(
+            lambda: [generate_image_derivatives_task.delay(label, pk) for label, pk in jobs]
+        )
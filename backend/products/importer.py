@@ -0,0 +1,287 @@
+"""
+Streaming bulk catalog import for vendors.
+
+Two input formats are accepted:
+
+* JSONL - one product per line, with nested `variants` and `sizes`.
+* CSV - one size per row. Product columns (slug, title, description,
+  badge, base_price, price, category, is_active) repeat on every row of
+  the product, and rows of the same product must be consecutive. Variant
+  columns are color_name, hex_code and price_override; size columns are
+  size_label and stock.
+
+Products are read lazily and written in chunks. Each chunk is one
+transaction that upserts by (vendor, slug) with bulk inserts and updates,
+so memory use and query count depend on the chunk size, not on the file.
+Slug ownership is checked inside that transaction with the existing rows
+locked, and checked again after the upsert, since a slug another vendor
+creates in between would otherwise be overwritten.
+"""
+import csv
+import io
+import json
+from itertools import groupby, islice
+
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+from .models import Category, Product, ProductVariant, ProductSize
+from .serializers import ImportProductSerializer
+from .signals import catalog_changed
+from .stock import reconcile_stock
+
+FORMATS = ("csv", "jsonl")
+PRODUCT_COLUMNS = ["slug", "title", "description", "badge", "base_price", "price", "category", "is_active"]
+VARIANT_COLUMNS = ["color_name", "hex_code", "price_override"]
+SIZE_COLUMNS = ["size_label", "stock"]
+MAX_REPORTED_ERRORS = 1000
+
+
+class SlugTaken(Exception):
+    """Another vendor created some of the chunk's slugs after they were resolved"""
+
+    def __init__(self, slugs):
+        super().__init__(slugs)
+        self.slugs = slugs
+
+
+class ImportRow:
+    def __init__(self, line, data=None, errors=None):
+        self.line = line
+        self.data = data
+        self.errors = errors
+
+
+def _text(stream):
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+
+def _blank_to_none(row, columns):
+    return {col: row[col] for col in columns if row.get(col) not in (None, "")}
+
+
+def read_jsonl(stream):
+    for line, raw in enumerate(_text(stream), start=1):
+        if not raw.strip():
+            continue
+        try:
+            yield ImportRow(line, json.loads(raw))
+        except ValueError as exc:
+            yield ImportRow(line, errors={"non_field_errors": [f"Invalid JSON: {exc}"]})
+
+
+def read_csv(stream):
+    reader = csv.DictReader(_text(stream))
+    numbered = ((reader.line_num, row) for row in reader)
+
+    def product_key(item):
+        _, row = item
+        return row.get("slug") or row.get("title") or ""
+
+    for _, items in groupby(numbered, key=product_key):
+        items = list(items)
+        first_line, first = items[0]
+        product = _blank_to_none(first, PRODUCT_COLUMNS)
+        variants = {}
+        for _, row in items:
+            if not row.get("color_name"):
+                continue
+            variant = variants.setdefault(
+                row["color_name"], dict(_blank_to_none(row, VARIANT_COLUMNS), sizes=[])
+            )
+            if row.get("size_label"):
+                variant["sizes"].append(_blank_to_none(row, SIZE_COLUMNS))
+        product["variants"] = list(variants.values())
+        yield ImportRow(first_line, product)
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+class ProductImporter:
+    def __init__(self, vendor, chunk_size=500, progress=None):
+        self.vendor = vendor
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.report = {"processed": 0, "created": 0, "updated": 0, "failed": 0, "errors": []}
+
+    def run(self, stream, fmt):
+        if fmt not in READERS:
+            raise ValueError(f"Unsupported import format: {fmt}")
+        rows = READERS[fmt](stream)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+            if self.progress:
+                self.progress(self.summary())
+        return self.report
+
+    def summary(self):
+        return {key: value for key, value in self.report.items() if key != "errors"}
+
+    def fail(self, row, errors):
+        self.report["failed"] += 1
+        if len(self.report["errors"]) < MAX_REPORTED_ERRORS:
+            self.report["errors"].append({"line": row.line, "errors": errors})
+        else:
+            self.report["errors_truncated"] = True
+
+    def validate(self, chunk):
+        valid = []
+        for row in chunk:
+            self.report["processed"] += 1
+            if row.errors:
+                self.fail(row, row.errors)
+                continue
+            serializer = ImportProductSerializer(data=row.data)
+            if not serializer.is_valid():
+                self.fail(row, serializer.errors)
+                continue
+            row.data = serializer.validated_data
+            row.data["slug"] = row.data["slug"] or slugify(row.data["title"])
+            valid.append(row)
+        return valid
+
+    def resolve(self, rows):
+        """
+        Resolve categories and slug ownership for the whole chunk in two
+        queries. Must run inside the chunk's transaction: existing slugs are
+        locked until it ends.
+        """
+        refs = {row.data["category"] for row in rows if row.data["category"]}
+        categories = {}
+        if refs:
+            for category in Category.objects.filter(Q(slug__in=refs) | Q(name__in=refs)):
+                categories[category.slug] = category
+                categories[category.name] = category
+
+        slugs = [row.data["slug"] for row in rows]
+        existing = {
+            slug: (vendor_id, category_id)
+            for slug, vendor_id, category_id in Product.objects.select_for_update().filter(slug__in=slugs).values_list(
+                "slug", "vendor_id", "category_id"
+            )
+        }
+        owners = {slug: vendor_id for slug, (vendor_id, _) in existing.items()}
+
+        resolved, seen = [], set()
+        for row in rows:
+            slug, ref = row.data["slug"], row.data["category"]
+            if slug in seen:
+                self.fail(row, {"slug": [f"Duplicate slug in file: {slug}"]})
+            elif owners.get(slug, self.vendor.pk) != self.vendor.pk:
+                self.fail(row, {"slug": [f"Slug already used by another vendor: {slug}"]})
+            elif ref and ref not in categories:
+                self.fail(row, {"category": [f"Unknown category: {ref}"]})
+            else:
+                seen.add(slug)
+                row.category = categories.get(ref)
+                row.exists = slug in owners
+                row.previous_category_id = existing[slug][1] if row.exists else None
+                resolved.append(row)
+        return resolved
+
+    def import_chunk(self, chunk):
+        rows = self.validate(chunk)
+        while True:
+            try:
+                with transaction.atomic():
+                    rows = self.resolve(rows)
+                    if not rows:
+                        return
+                    product_ids = self.write(rows)
+                    reconcile_stock(product_ids)
+                    # Upserts may move products out of their previous category
+                    catalog_changed(category_ids={row.previous_category_id for row in rows})
+            except SlugTaken as exc:
+                # The chunk was rolled back; retry it without the taken slugs
+                for row in rows:
+                    if row.data["slug"] in exc.slugs:
+                        self.fail(row, {"slug": [f"Slug already used by another vendor: {row.data['slug']}"]})
+                rows = [row for row in rows if row.data["slug"] not in exc.slugs]
+                continue
+            except DatabaseError as exc:
+                for row in rows:
+                    self.fail(row, {"non_field_errors": [f"Database error: {exc}"]})
+                return
+            break
+
+        updated = sum(1 for row in rows if row.exists)
+        self.report["updated"] += updated
+        self.report["created"] += len(rows) - updated
+
+    def write(self, rows):
+        products = Product.objects.bulk_create(
+            [
+                Product(
+                    vendor=self.vendor,
+                    slug=row.data["slug"],
+                    title=row.data["title"],
+                    description=row.data["description"],
+                    badge=row.data["badge"],
+                    base_price=row.data["base_price"],
+                    price=row.data["price"] or row.data["base_price"],
+                    category=row.category,
+                    is_active=row.data["is_active"],
+                )
+                for row in rows
+            ],
+            update_conflicts=True,
+            unique_fields=["slug"],
+            update_fields=["title", "description", "badge", "base_price", "price", "category", "is_active", "updated_at"],
+        )
+        product_ids = [product.pk for product in products]
+        # A slug created by another vendor since resolve() was updated in place
+        taken = set(
+            Product.objects.filter(pk__in=product_ids).exclude(vendor=self.vendor).values_list("slug", flat=True)
+        )
+        if taken:
+            raise SlugTaken(taken)
+
+        # Variants keyed by (product, color)
+        variants = {
+            (variant.product_id, variant.color_name): variant
+            for variant in ProductVariant.objects.filter(product_id__in=product_ids)
+        }
+        new_variants, changed_variants = [], []
+        for product, row in zip(products, rows):
+            for data in row.data["variants"]:
+                variant = variants.get((product.pk, data["color_name"]))
+                if variant is None:
+                    variant = ProductVariant(product=product, color_name=data["color_name"])
+                    variants[(product.pk, data["color_name"])] = variant
+                    new_variants.append(variant)
+                elif variant.pk:
+                    changed_variants.append(variant)
+                variant.hex_code = data["hex_code"]
+                variant.price_override = data["price_override"]
+        ProductVariant.objects.bulk_create(new_variants)
+        ProductVariant.objects.bulk_update(changed_variants, ["hex_code", "price_override"])
+
+        # Sizes keyed by (variant, label)
+        sizes = {
+            (size.variant_id, size.size_label): size
+            for size in ProductSize.objects.filter(variant__product_id__in=product_ids)
+        }
+        new_sizes, changed_sizes = [], []
+        for product, row in zip(products, rows):
+            for data in row.data["variants"]:
+                variant = variants[(product.pk, data["color_name"])]
+                for size_data in data["sizes"]:
+                    size = sizes.get((variant.pk, size_data["size_label"]))
+                    if size is None:
+                        size = ProductSize(variant=variant, size_label=size_data["size_label"])
+                        sizes[(variant.pk, size_data["size_label"])] = size
+                        new_sizes.append(size)
+                    elif size.pk:
+                        changed_sizes.append(size)
+                    size.stock = size_data["stock"]
+        ProductSize.objects.bulk_create(new_sizes)
+        ProductSize.objects.bulk_update(changed_sizes, ["stock"])
+
+        return product_ids
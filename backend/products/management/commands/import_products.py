@@ -0,0 +1,52 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from products.importer import FORMATS, ProductImporter
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Import products, variants and sizes for a vendor from a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--vendor', required=True, help='Vendor email or id')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--report', help='Write the full per-row error report to this JSON file')
+
+    def handle(self, *args, **options):
+        vendor_ref = options['vendor']
+        lookup = {'pk': vendor_ref} if vendor_ref.isdigit() else {'email': vendor_ref}
+        try:
+            vendor = User.objects.get(**lookup)
+        except User.DoesNotExist:
+            raise CommandError(f'Vendor not found: {vendor_ref}')
+
+        fmt = options['format'] or options['path'].rsplit('.', 1)[-1].lower()
+        if fmt not in FORMATS:
+            raise CommandError(f'Unsupported format: {fmt}')
+
+        def progress(summary):
+            self.stdout.write(
+                f"Processed {summary['processed']}: {summary['created']} created, "
+                f"{summary['updated']} updated, {summary['failed']} failed"
+            )
+
+        importer = ProductImporter(vendor, chunk_size=options['chunk_size'], progress=progress)
+        with open(options['path'], 'rb') as stream:
+            report = importer.run(stream, fmt)
+
+        for error in report['errors'][:20]:
+            self.stdout.write(self.style.WARNING(f"Line {error['line']}: {error['errors']}"))
+        if options['report']:
+            with open(options['report'], 'w') as out:
+                json.dump(report, out, indent=2, default=str)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Import finished: {report['created']} created, {report['updated']} updated, {report['failed']} failed."
+            )
+        )
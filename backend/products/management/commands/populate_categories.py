@@ -1,41 +1,46 @@
 from django.core.management.base import BaseCommand
 from products.models import Category
 
+# Parent category -> subcategories
+CATEGORY_TREE = {
+    'Sneakers': ['Running', 'Casual', 'Lifestyle'],
+    'Sports': ['Athletic'],
+    'Formal': ['Dress Shoes'],
+    'Boots': [],
+    'Sandals': [],
+}
+
 
 class Command(BaseCommand):
-    help = 'Populate categories in the database'
+    help = 'Populate the category tree in the database'
 
-    def handle(self, *args, **options):
-        categories = [
-            'Sneakers',
-            'Running',
-            'Casual',
-            'Formal',
-            'Sports',
-            'Lifestyle',
-            'Athletic',
-            'Boots',
-            'Sandals',
-            'Dress Shoes'
-        ]
+    def get_or_create_category(self, name, parent=None):
+        category, created = Category.objects.get_or_create(
+            name=name,
+            defaults={'slug': name.lower().replace(' ', '-'), 'parent': parent}
+        )
+        if created:
+            self.stdout.write(self.style.SUCCESS(f'Created category: {name}'))
+        elif category.parent_id != (parent.pk if parent else None):
+            category.parent = parent
+            category.save()
+            self.stdout.write(self.style.SUCCESS(f'Moved category: {name} under {parent or "top level"}'))
+        else:
+            self.stdout.write(self.style.WARNING(f'Category already exists: {name}'))
+        return category, created
 
+    def handle(self, *args, **options):
+        processed_count = 0
         created_count = 0
-        for category_name in categories:
-            category, created = Category.objects.get_or_create(
-                name=category_name,
-                defaults={'slug': category_name.lower().replace(' ', '-')}
-            )
-            if created:
-                created_count += 1
-                self.stdout.write(
-                    self.style.SUCCESS(f'Created category: {category_name}')
-                )
-            else:
-                self.stdout.write(
-                    self.style.WARNING(f'Category already exists: {category_name}')
-                )
+        for parent_name, children in CATEGORY_TREE.items():
+            parent, created = self.get_or_create_category(parent_name)
+            created_count += created
+            processed_count += 1
+            for child_name in children:
+                _, created = self.get_or_create_category(child_name, parent)
+                created_count += created
+                processed_count += 1
 
         self.stdout.write(
-            self.style.SUCCESS(f'Successfully processed {len(categories)} categories. Created {created_count} new categories.')
+            self.style.SUCCESS(f'Successfully processed {processed_count} categories. Created {created_count} new categories.')
         )
-
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from products.cards import rebuild_product_cards
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed product card documents'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        product_ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+
+        rebuilt = 0
+        for start in range(0, len(product_ids), batch_size):
+            rebuilt += rebuild_product_cards(product_ids[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} product cards.'))
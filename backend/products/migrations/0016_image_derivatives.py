@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_productcard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Responsive renditions, see products.images'),
+        ),
+        migrations.AddField(
+            model_name='productmediaitem',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Responsive renditions, see products.images'),
+        ),
+    ]
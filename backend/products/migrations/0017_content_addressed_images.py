@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:19
+
+import core.storage
+import products.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.ImageField(storage=core.storage.ContentAddressedStorage(), upload_to=core.storage.ContentHashPath('image'), validators=[products.validators.validate_image]),
+        ),
+        migrations.AlterField(
+            model_name='productmediaitem',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.storage.ContentHashPath('image'), validators=[products.validators.validate_image]),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:25
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_effective_price(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductVariant = apps.get_model('products', 'ProductVariant')
+
+    default_price = Coalesce(OuterRef('price'), OuterRef('base_price'))
+    variant_prices = ProductVariant.objects.filter(product_id=OuterRef('pk')).order_by().values('product_id')
+
+    def bound(aggregate):
+        subquery = variant_prices.annotate(value=aggregate(Coalesce('price_override', default_price))).values('value')
+        return Coalesce(Subquery(subquery), F('price'), F('base_price'))
+
+    Product.objects.update(min_effective_price=bound(Min), max_effective_price=bound(Max))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0017_content_addressed_images'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='max_effective_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Highest price payable across variants', max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='min_effective_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Lowest price payable across variants', max_digits=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['min_effective_price', 'id'], name='product_min_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['max_effective_price'], name='product_max_price_idx'),
+        ),
+        migrations.RunPython(populate_effective_price, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:27
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db import migrations, models
+from django.db.models import OuterRef
+from django.db.models.functions import Lower, Upper
+
+
+def populate_availability(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductSize = apps.get_model('products', 'ProductSize')
+    ProductVariant = apps.get_model('products', 'ProductVariant')
+
+    sizes = (
+        ProductSize.objects.filter(variant__product_id=OuterRef('pk'), stock__gt=0)
+        .annotate(value=Upper('size_label')).values('value').distinct().order_by('value')
+    )
+    colors = (
+        ProductVariant.objects.filter(product_id=OuterRef('pk'), sizes__stock__gt=0)
+        .annotate(value=Lower('color_name')).values('value').distinct().order_by('value')
+    )
+    Product.objects.update(available_sizes=ArraySubquery(sizes), available_colors=ArraySubquery(colors))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0018_product_effective_price'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='available_colors',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=50), blank=True, default=list, editable=False, help_text='Lower-cased colors with stock in some size', size=None),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='available_sizes',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=10), blank=True, default=list, editable=False, help_text='Upper-cased size labels with stock', size=None),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['available_sizes'], name='product_available_sizes_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['available_colors'], name='product_available_colors_gin'),
+        ),
+        migrations.RunPython(populate_availability, migrations.RunPython.noop),
+    ]
@@ -1,21 +1,280 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import models
+from django.db.models import Case, F, Func, Max, Min, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Concat, Greatest, Lower, Now, Substr, Upper
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.utils.text import slugify
 from django.conf import settings
 from .validators import pricing_rule, validate_image
-from .utils import product_variant_image_path
+from core.storage import ContentHashPath, content_addressed_storage
 from rest_framework.validators import ValidationError
 
 
 User = settings.AUTH_USER_MODEL
 
+class CategoryQuerySet(models.QuerySet):
+    def refresh_product_counts(self):
+        """Recount active products in each category's subtree in a single UPDATE"""
+        counts = Product.objects.filter(
+            category__path__startswith=OuterRef("path"), is_active=True
+        ).order_by().values(total=Func(F("pk"), function="COUNT"))
+        return self.update(active_product_count=Coalesce(Subquery(counts), Value(0)))
+
+    def with_ancestors(self):
+        """These categories plus every category above them, read from their paths"""
+        ids = set()
+        for path in self.values_list("path", flat=True):
+            ids.update(Category.path_ids(path))
+        return Category.objects.filter(pk__in=ids)
+
+    def subtree(self, category):
+        """A category and all of its descendants: one prefix scan on the path index"""
+        return self.filter(path__startswith=category.path)
+
+
 class Category(models.Model):
+    PATH_SEPARATOR = "/"
+
     name = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(unique=True, blank=True, db_index=True)
+    parent = models.ForeignKey("self", on_delete=models.PROTECT, null=True, blank=True, related_name="children")
+    # Materialized path of ancestor ids, e.g. "3/17/42/"; maintained in save()
+    path = models.CharField(max_length=255, blank=True, default="", editable=False)
+    active_product_count = models.PositiveIntegerField(default=0, editable=False, help_text="Active products in this category and its subcategories")
+
+    objects = CategoryQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = "categories"
+        indexes = [
+            models.Index(fields=["path"], name="category_path_prefix_idx", opclasses=["varchar_pattern_ops"]),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._synced_path = instance.__dict__.get("path")
+        return instance
+
+    @classmethod
+    def path_ids(cls, path):
+        return [int(pk) for pk in path.split(cls.PATH_SEPARATOR) if pk]
+
+    @property
+    def depth(self):
+        return len(self.path_ids(self.path)) - 1
+
+    def clean(self):
+        if self.parent_id and self.pk and self.pk in self.path_ids(self.parent.path):
+            raise DjangoValidationError({"parent": "A category cannot be moved under itself or its descendants."})
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = slugify(self.name)
+        self.clean()
+        super().save(*args, **kwargs)
+
+        parent_path = self.parent.path if self.parent_id else ""
+        path = f"{parent_path}{self.pk}{self.PATH_SEPARATOR}"
+        old_path = getattr(self, "_synced_path", None) or ""
+        if path == old_path:
+            return
+        if old_path:
+            # Rewrite the whole subtree's prefix in one UPDATE
+            Category.objects.filter(path__startswith=old_path).update(
+                path=Concat(Value(path), Substr("path", len(old_path) + 1))
+            )
+            moved_from = self.path_ids(old_path)[:-1]
+        else:
+            Category.objects.filter(pk=self.pk).update(path=path)
+            moved_from = []
+        self.path = self._synced_path = path
+        Category.objects.filter(pk__in=moved_from + self.path_ids(path)).refresh_product_counts()
 
     def __str__(self):
         return self.name
 
 
+# Fields whose changes require the product's search vector to be rebuilt
+SEARCH_SOURCE_FIELDS = {"title", "description", "category", "category_id", "vendor", "vendor_id"}
+SEARCH_CONFIG = "english"
+# Fields whose changes move a product in or out of Category.active_product_count
+CATEGORY_COUNT_FIELDS = {"is_active", "category", "category_id"}
+
+
+def product_search_vector():
+    """Weighted tsvector: title (A), description (B), category and shop name (C)"""
+    from users.models import VendorProfile
+
+    category_name = Subquery(
+        Category.objects.filter(pk=OuterRef("category_id")).values("name")[:1]
+    )
+    shop_name = Subquery(
+        VendorProfile.objects.filter(user_id=OuterRef("vendor_id")).values("shop_name")[:1]
+    )
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="B", config=SEARCH_CONFIG)
+        + SearchVector(category_name, weight="C", config=SEARCH_CONFIG)
+        + SearchVector(shop_name, weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def effective_price_expressions():
+    """
+    Subquery expressions for Product.min/max_effective_price.
+
+    A variant without a price override sells at the product's price, falling
+    back to base_price; a product without variants uses those directly.
+    """
+    default_price = Coalesce(OuterRef("price"), OuterRef("base_price"))
+    variant_prices = (
+        ProductVariant.objects.filter(product_id=OuterRef("pk"))
+        .order_by()
+        .values("product_id")
+    )
+
+    def bound(aggregate):
+        subquery = variant_prices.annotate(
+            value=aggregate(Coalesce("price_override", default_price))
+        ).values("value")
+        return Coalesce(Subquery(subquery), F("price"), F("base_price"))
+
+    return {"min_effective_price": bound(Min), "max_effective_price": bound(Max)}
+
+
+def availability_expressions():
+    """
+    Subquery expressions for Product.available_sizes/available_colors.
+
+    Sizes (upper-cased) and colors (lower-cased) that have stock > 0, so
+    "in stock in my size" is an array containment test on a GIN index.
+    """
+    sizes = (
+        ProductSize.objects.filter(variant__product_id=OuterRef("pk"), stock__gt=0)
+        .annotate(value=Upper("size_label"))
+        .values("value")
+        .distinct()
+        .order_by("value")
+    )
+    colors = (
+        ProductVariant.objects.filter(product_id=OuterRef("pk"), sizes__stock__gt=0)
+        .annotate(value=Lower("color_name"))
+        .values("value")
+        .distinct()
+        .order_by("value")
+    )
+    return {"available_sizes": ArraySubquery(sizes), "available_colors": ArraySubquery(colors)}
+
+
+class ProductQuerySet(models.QuerySet):
+    """Keeps Product.search_vector in step with bulk writes that bypass save()"""
+
+    def update_search_vector(self):
+        return super().update(search_vector=product_search_vector())
+
+    def apply_stock_delta(self, delta):
+        """Atomically shift stock by `delta`, never below zero"""
+        return super().update(stock=Greatest(F("stock") + delta, Value(0)))
+
+    def subtract_stock(self, quantities):
+        """Take quantities[pk] units from each product in one UPDATE, never below zero"""
+        if not quantities:
+            return 0
+        taken = Case(
+            *[When(pk=pk, then=Value(quantity)) for pk, quantity in quantities.items()],
+            output_field=models.IntegerField(),
+        )
+        return self.filter(pk__in=quantities).order_by().update(stock=Greatest(F("stock") - taken, Value(0)))
+
+    def decrement_stock(self, quantities):
+        """
+        Take quantities[pk] units from each product in one conditional UPDATE.
+
+        Only rows with enough stock are changed; the caller compares the
+        returned row count with len(quantities) to detect a shortfall.
+        """
+        if not quantities:
+            return 0
+        wanted = Case(
+            *[When(pk=pk, then=Value(quantity)) for pk, quantity in quantities.items()],
+            output_field=models.IntegerField(),
+        )
+        return (
+            self.filter(pk__in=quantities, stock__gte=wanted)
+            .order_by()
+            .update(stock=F("stock") - wanted)
+        )
+
+    def reconcile_stock(self):
+        """Set stock to the sum of each product's size stock in a single UPDATE"""
+        total = (
+            ProductSize.objects.filter(variant__product_id=OuterRef("pk"))
+            .order_by()
+            .values("variant__product_id")
+            .annotate(total=Sum("stock"))
+            .values("total")
+        )
+        return super().update(stock=Coalesce(Subquery(total), Value(0)))
+
+    def refresh_derived_fields(self):
+        """
+        Effective prices and availability together, in one UPDATE.
+
+        Also bumps updated_at: the caller is reacting to a change in the
+        product's variants, sizes, images or media, so its representation
+        (and its ETag) changed even if its own row did not.
+        """
+        return super().update(
+            **effective_price_expressions(), **availability_expressions(), updated_at=Now()
+        )
+
+    def update(self, **kwargs):
+        counted = CATEGORY_COUNT_FIELDS.intersection(kwargs)
+        if not SEARCH_SOURCE_FIELDS.intersection(kwargs) and not counted:
+            return super().update(**kwargs)
+        # Capture the rows first: the update may change what the filter matches
+        pks = list(self.values_list("pk", flat=True))
+        category_ids = set(self.values_list("category_id", flat=True)) if counted else set()
+        rows = super().update(**kwargs)
+        updated = self.model.objects.filter(pk__in=pks)
+        if SEARCH_SOURCE_FIELDS.intersection(kwargs):
+            updated.update_search_vector()
+        if counted:
+            from .signals import catalog_changed
+            category_ids.update(updated.values_list("category_id", flat=True))
+            catalog_changed(category_ids=category_ids)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        pks = [obj.pk for obj in objs if obj.pk is not None]
+        if pks:
+            from .signals import catalog_changed
+            self.model.objects.filter(pk__in=pks).update_search_vector()
+            catalog_changed(category_ids={obj.category_id for obj in objs})
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        pks = [obj.pk for obj in objs]
+        counted = CATEGORY_COUNT_FIELDS.intersection(fields)
+        # Both the categories the products leave and the ones they join move
+        category_ids = set()
+        if counted:
+            category_ids.update(self.model.objects.filter(pk__in=pks).values_list("category_id", flat=True))
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        if SEARCH_SOURCE_FIELDS.intersection(fields):
+            self.model.objects.filter(pk__in=pks).update_search_vector()
+        if counted:
+            from .signals import catalog_changed
+            category_ids.update(obj.category_id for obj in objs)
+            catalog_changed(category_ids=category_ids)
+        return rows
+
+
 class Product(models.Model):
     vendor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='products')
     badge = models.CharField(max_length=255, blank=True, null=True)
@@ -25,23 +284,56 @@ class Product(models.Model):
     base_price = models.DecimalField(max_digits=10, decimal_places=2, validators=[pricing_rule], null=True, blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[pricing_rule], null=True, blank=True, help_text="Main product price")
     stock = models.PositiveIntegerField(default=0, help_text="Total stock across all variants")
+    min_effective_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False, help_text="Lowest price payable across variants")
+    max_effective_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False, help_text="Highest price payable across variants")
+    available_sizes = ArrayField(models.CharField(max_length=10), default=list, blank=True, editable=False, help_text="Upper-cased size labels with stock")
+    available_colors = ArrayField(models.CharField(max_length=50), default=list, blank=True, editable=False, help_text="Lower-cased colors with stock in some size")
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='products')
     is_active = models.BooleanField(default=True)
+    flash_sale = models.BooleanField(default=False, help_text="Sell through the in-memory stock counter during a limited drop")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ProductQuerySet.as_manager()
 
     class Meta:
         indexes = [
             models.Index(fields=['title', 'category', 'vendor']),
-            models.Index(fields=['slug'])
+            models.Index(fields=['slug']),
+            GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+            # Keyset pagination on /api/products/ (ordering column + id tie-breaker)
+            models.Index(fields=['-created_at', '-id'], name='product_created_keyset_idx'),
+            models.Index(fields=['base_price', 'id'], name='product_price_keyset_idx'),
+            # Price sorting, keyset pages and price_min/price_max range scans
+            models.Index(fields=['min_effective_price', 'id'], name='product_min_price_idx'),
+            models.Index(fields=['max_effective_price'], name='product_max_price_idx'),
+            # size=/color= filters (array containment)
+            GinIndex(fields=['available_sizes'], name='product_available_sizes_gin'),
+            GinIndex(fields=['available_colors'], name='product_available_colors_gin'),
         ]
         constraints = [
             models.UniqueConstraint(fields=['slug', 'vendor'], name="unique_slug_vendor")
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._synced_category_id = instance.__dict__.get('category_id')
+        instance._synced_is_active = instance.__dict__.get('is_active')
+        instance._synced_flash_sale = instance.__dict__.get('flash_sale')
+        instance._synced_stock = instance.__dict__.get('stock')
+        return instance
+
+    def clean(self):
+        # Per-process counters would let every worker sell the same units
+        if self.flash_sale and not getattr(self, "_synced_flash_sale", False) and not settings.FLASH_SALE_COUNTERS:
+            raise DjangoValidationError({"flash_sale": "Flash sales need a shared stock counter store (FLASH_SALE_COUNTERS)."})
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        self.clean()
         super().save(*args, **kwargs)
 
     def sync_price_and_stock(self):
@@ -49,15 +341,10 @@ class Product(models.Model):
         # Set price to base_price if not set
         if not self.price and self.base_price:
             self.price = self.base_price
-        
-        # Calculate total stock from all variants
-        total_stock = 0
-        for variant in self.variants.all():
-            for size in variant.sizes.all():
-                total_stock += size.stock
-        
-        self.stock = total_stock
-        self.save(update_fields=['stock'])
+
+        # Full reconciliation; routine size edits use products.stock deltas instead
+        Product.objects.filter(pk=self.pk).reconcile_stock()
+        self.refresh_from_db(fields=['stock'])
 
     def __str__(self):
         return f'{self.title} ({self.vendor})'
@@ -75,7 +362,8 @@ class ProductVariant(models.Model):
 
 class ProductImage(models.Model):
     variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name='images', null=True, blank=True,)
-    image = models.ImageField(upload_to=product_variant_image_path, validators=[validate_image])
+    image = models.ImageField(upload_to=ContentHashPath("image"), storage=content_addressed_storage, validators=[validate_image])
+    derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text="Responsive renditions, see products.images")
 
     def __str__(self):
         return f"Image for {self.variant}"
@@ -86,23 +374,65 @@ class ProductSize(models.Model):
     size_label = models.CharField(max_length=10)
     stock = models.PositiveIntegerField(default=0)
 
+    # Stock and variant as last read from / written to the database; new rows start at 0
+    _synced_stock = 0
+    _synced_variant_id = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._synced_stock = instance.__dict__.get('stock')
+        instance._synced_variant_id = instance.__dict__.get('variant_id')
+        return instance
+
+    def get_product_id(self, variant_id=None):
+        variant_id = variant_id or self.variant_id
+        if not variant_id:
+            return None
+        if variant_id == self.variant_id and ProductSize.variant.is_cached(self):
+            return self.variant.product_id
+        return ProductVariant.objects.filter(pk=variant_id).values_list('product_id', flat=True).first()
+
     def save(self, *args, **kwargs):
+        from .stock import record_stock_change
+
         super().save(*args, **kwargs)
-        # Sync product stock when size stock changes
-        if self.variant and self.variant.product:
-            self.variant.product.sync_price_and_stock()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'stock', 'variant', 'variant_id'}.intersection(update_fields):
+            return
 
-    def delete(self, *args, **kwargs):
-        product = self.variant.product if self.variant else None
-        super().delete(*args, **kwargs)
-        # Sync product stock when size is deleted
-        if product:
-            product.sync_price_and_stock()
+        # Push the stock delta to the product instead of rescanning every size
+        product_id = self.get_product_id()
+        previous_variant_id = self._synced_variant_id
+        if previous_variant_id and previous_variant_id != self.variant_id:
+            record_stock_change(self.get_product_id(previous_variant_id), None)
+            record_stock_change(product_id, None)
+        elif self._synced_stock is None:
+            record_stock_change(product_id, None)
+        else:
+            record_stock_change(product_id, self.stock - self._synced_stock)
+        self._synced_stock = self.stock
+        self._synced_variant_id = self.variant_id
 
     def __str__(self):
         return f"{self.variant} - {self.size_label} ({self.stock} in stock)"
 
 
+class ProductCard(models.Model):
+    """Precomputed storefront-grid document for a product, maintained by products.cards"""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="card")
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    thumbnail_url = models.CharField(max_length=500, blank=True)
+    colors = models.JSONField(default=list, blank=True)
+    sizes = models.JSONField(default=list, blank=True)
+    in_stock = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Card for {self.product_id}"
+
+
 class ProductMediaSection(models.Model):
     SECTION_TYPES = [
         ("IMAGE_ROW", "Image Row (3-up)"),
@@ -131,7 +461,8 @@ class ProductMediaItem(models.Model):
 
     section = models.ForeignKey(ProductMediaSection, on_delete=models.CASCADE, related_name="items")
     item_type = models.CharField(max_length=10, choices=ITEM_TYPES)
-    image = models.ImageField(upload_to="products/media/", blank=True, null=True, validators=[validate_image])
+    image = models.ImageField(upload_to=ContentHashPath("image"), storage=content_addressed_storage, blank=True, null=True, validators=[validate_image])
+    derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text="Responsive renditions, see products.images")
     video_url = models.URLField(blank=True, null=True, help_text="External video link")
     text = models.CharField(max_length=255, blank=True, null=True)
     order = models.PositiveIntegerField(default=0)
@@ -0,0 +1,166 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class ProductPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class KeysetField:
+    """An ordering column paired with `id` as the tie-breaker"""
+
+    def __init__(self, name, nullable=False, parse=str):
+        self.name = name
+        self.nullable = nullable
+        self.parse = parse
+
+    def dump(self, value):
+        if value is None:
+            return None
+        return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+    def load(self, raw):
+        if raw is None:
+            return None
+        value = self.parse(raw)
+        if value is None:
+            raise ValueError(raw)
+        return value
+
+
+def _parse_decimal(raw):
+    try:
+        return Decimal(raw)
+    except InvalidOperation:
+        raise ValueError(raw)
+
+
+class ProductCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the public catalog: no COUNT(*) and no OFFSET.
+
+    Each page is a single indexed range scan on (ordering column, id). Cursors
+    are opaque base64 tokens holding the boundary row's key, so page N costs
+    the same as page 1. Only the orderings in `keyset_fields` are supported;
+    anything else falls back to the view's default ordering.
+    """
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    invalid_cursor_message = "Invalid cursor"
+
+    keyset_fields = {
+        "created_at": KeysetField("created_at", parse=parse_datetime),
+        "base_price": KeysetField("base_price", nullable=True, parse=_parse_decimal),
+        "min_effective_price": KeysetField("min_effective_price", nullable=True, parse=_parse_decimal),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        requested = request.query_params.get(api_settings.ORDERING_PARAM, "")
+        if requested.lstrip("-") in self.keyset_fields:
+            return requested
+        default = (getattr(view, "ordering", None) or ["-created_at"])[0]
+        return default if default.lstrip("-") in self.keyset_fields else "-created_at"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.field = self.keyset_fields[self.ordering.lstrip("-")]
+        self.descending = self.ordering.startswith("-")
+
+        cursor = self.decode_cursor(request)
+        self.reverse = bool(cursor and cursor["r"])
+        descending = self.descending != self.reverse
+
+        queryset = queryset.order_by(*self._order_by(descending))
+        if cursor is not None:
+            queryset = queryset.filter(self._after(descending, cursor["v"], cursor["id"]))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        if self.reverse:
+            self.has_next, self.has_previous = cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = results
+        return results
+
+    def _order_by(self, descending):
+        # Nulls always sort after real values in forward direction
+        nulls = {"nulls_first": True} if self.reverse else {"nulls_last": True}
+        field = F(self.field.name)
+        column = field.desc(**nulls) if descending else field.asc(**nulls)
+        return [column, "-id" if descending else "id"]
+
+    def _after(self, descending, value, pk):
+        """Rows strictly after (value, pk) in the current scan direction"""
+        name = self.field.name
+        cmp = "lt" if descending else "gt"
+        bound = "lte" if descending else "gte"
+        nulls_last = not self.reverse
+
+        if value is None:
+            q = Q(**{f"{name}__isnull": True, f"id__{cmp}": pk})
+            if not nulls_last:
+                q |= Q(**{f"{name}__isnull": False})
+            return q
+
+        # The redundant range bound keeps the predicate index-friendly
+        q = Q(**{f"{name}__{bound}": value}) & (
+            Q(**{f"{name}__{cmp}": value}) | Q(**{name: value, f"id__{cmp}": pk})
+        )
+        if self.field.nullable and nulls_last:
+            q |= Q(**{f"{name}__isnull": True})
+        return q
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(urlsafe_b64decode(encoded.encode("ascii")).decode("utf-8"))
+            if data["o"] != self.ordering:
+                raise ValueError(data["o"])
+            return {
+                "v": self.field.load(data["v"]),
+                "id": int(data["id"]),
+                "r": bool(data.get("r")),
+            }
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse):
+        data = {
+            "o": self.ordering,
+            "v": self.field.dump(getattr(obj, self.field.name)),
+            "id": obj.pk,
+            "r": int(reverse),
+        }
+        token = urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+        return replace_query_param(self.base_url, self.cursor_query_param, token.decode("ascii"))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
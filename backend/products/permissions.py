@@ -6,13 +6,13 @@ class IsVendorOrAdmin(BasePermission):
     or admins to access all products.
     """
     
-    def has_permission(self, request):
+    def has_permission(self, request, view):
         if not request.user.is_authenticated:
             return False
         
         return request.user.role in ['vendor', 'admin'] or request.user.is_superuser
   
-    def has_object_permission(self, request, obj):
+    def has_object_permission(self, request, view, obj):
         if request.user.is_superuser or request.user.role == 'admin':
             return True
         
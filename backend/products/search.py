@@ -0,0 +1,41 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+from .models import SEARCH_CONFIG
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    Full-text search over Product.search_vector (GIN indexed).
+
+    Reads `?q=` and falls back to the legacy `?search=` parameter. Matches are
+    annotated with `search_rank`; unless the client asked for an explicit
+    `?ordering=`, results are ordered by rank. Must run after OrderingFilter
+    so the default ordering does not override the rank.
+    """
+    search_param = "q"
+    legacy_search_param = api_settings.SEARCH_PARAM
+    search_description = "Full-text search over title, description, category and shop name."
+
+    def get_search_query(self, request):
+        params = request.query_params
+        term = params.get(self.search_param) or params.get(self.legacy_search_param) or ""
+        term = term.replace("\x00", "").strip()
+        if not term:
+            return None
+        return SearchQuery(term, search_type="websearch", config=SEARCH_CONFIG)
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if query is None:
+            return queryset
+
+        queryset = queryset.annotate(
+            search_rank=SearchRank(F("search_vector"), query)
+        ).filter(search_vector=query)
+
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+        return queryset.order_by("-search_rank", *queryset.query.order_by)
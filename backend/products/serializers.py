@@ -1,3 +1,5 @@
+from decimal import Decimal
+from django.db import transaction
 from rest_framework import serializers
 from .models import (
     Product, 
@@ -6,8 +8,22 @@ from .models import (
     ProductSize, 
     ProductImage,
     ProductMediaSection,
-    ProductMediaItem
+    ProductMediaItem,
+    ProductCard,
 )
+from .images import enqueue_derivatives, srcset_map
+from .stock import reconcile_stock
+
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """Accepts a `fields` argument restricting which declared fields are rendered"""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -16,12 +32,18 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ["id", "name", "slug"]
 
 
+class CategoryListSerializer(CategorySerializer):
+    class Meta(CategorySerializer.Meta):
+        fields = CategorySerializer.Meta.fields + ["parent", "active_product_count"]
+
+
 class ProductImageSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = ProductImage
-        fields = ["id", "image_url"]
+        fields = ["id", "image_url", "srcset"]
 
     def get_image_url(self, obj):
         request = self.context.get("request")
@@ -29,6 +51,9 @@ class ProductImageSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.image.url)
         return obj.image.url if obj.image else None
 
+    def get_srcset(self, obj):
+        return srcset_map(obj.image, self.context.get("request"))
+
 
 class ProductSizeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -37,7 +62,7 @@ class ProductSizeSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
-class ProductVariantSerializer(serializers.ModelSerializer):
+class ProductVariantSerializer(DynamicFieldsModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
     sizes = ProductSizeSerializer(many=True)
 
@@ -49,10 +74,14 @@ class ProductVariantSerializer(serializers.ModelSerializer):
 
 class ProductMediaItemSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField() 
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = ProductMediaItem
-        fields = ["id", "item_type", "image_url", "video_url", "text", "order"]
+        fields = ["id", "item_type", "image_url", "srcset", "video_url", "text", "order"]
+
+    def get_srcset(self, obj):
+        return srcset_map(obj.image, self.context.get("request"))
 
     def get_image_url(self, obj):
         request = self.context.get("request")
@@ -96,7 +125,7 @@ class ProductSerializer(serializers.ModelSerializer):
     media_sections = ProductMediaSectionSerializer(many=True, read_only=True)
     variants = ProductVariantSerializer(many=True, required=False)
 
-    class Meta(BaseProductSerializer):
+    class Meta(BaseProductSerializer.Meta):
         fields = BaseProductSerializer.Meta.fields + [
             "category_id",
             "is_active",
@@ -111,17 +140,37 @@ class ProductSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Price must be positive.")
         return value
     
+    @transaction.atomic
     def create(self, validated_data):
+        """
+        Create a product with its variants, sizes and images in a fixed
+        number of queries: one bulk insert per table, then a single stock
+        reconciliation. `variant_images` maps variant index to uploads.
+        """
         variants_data = validated_data.pop('variants', [])
+        variant_images = validated_data.pop('variant_images', {})
         product = Product.objects.create(**validated_data)
-        
-        for variant_data in variants_data:
-            sizes_data = variant_data.pop('sizes', [])
-            variant = ProductVariant.objects.create(product=product, **variant_data)
-            
-            for size_data in sizes_data:
-                ProductSize.objects.create(variant=variant, **size_data)
-        
+
+        variants = ProductVariant.objects.bulk_create([
+            ProductVariant(product=product, **{k: v for k, v in data.items() if k != 'sizes'})
+            for data in variants_data
+        ])
+        ProductSize.objects.bulk_create([
+            ProductSize(variant=variant, **size_data)
+            for variant, data in zip(variants, variants_data)
+            for size_data in data.get('sizes', [])
+        ])
+        images = ProductImage.objects.bulk_create([
+            ProductImage(variant=variants[index], image=upload)
+            for index, uploads in sorted(variant_images.items())
+            if index < len(variants)
+            for upload in uploads
+        ])
+        enqueue_derivatives(images)
+
+        # bulk_create bypasses ProductSize.save(), so reconcile once here
+        reconcile_stock([product.pk])
+        product.refresh_from_db(fields=['stock'])
         return product
     
 
@@ -140,6 +189,8 @@ class ProductPublicSerializer(serializers.ModelSerializer):
             "description",
             "base_price",
             "price",
+            "min_effective_price",
+            "max_effective_price",
             "stock",
             "category",
             "variants",
@@ -147,3 +198,104 @@ class ProductPublicSerializer(serializers.ModelSerializer):
             "vendor_name",
         ]
         read_only_fields = fields
+
+    def get_fields(self):
+        """Apply the request's sparse fieldset (see products.fieldsets), if any"""
+        fields = super().get_fields()
+        fieldset = self.context.get("fieldset")
+        if fieldset is None:
+            return fields
+
+        if not fieldset.expands("category"):
+            fields["category"] = serializers.PrimaryKeyRelatedField(read_only=True)
+        if fieldset.expands("variants"):
+            fields["variants"] = ProductVariantSerializer(
+                many=True,
+                read_only=True,
+                fields=[
+                    name for name in ProductVariantSerializer.Meta.fields
+                    if name not in ("images", "sizes") or fieldset.expands(f"variants.{name}")
+                ],
+            )
+        return {name: fields[name] for name in fieldset.output_fields()}
+
+
+class ProductCardSerializer(serializers.ModelSerializer):
+    """Storefront-grid representation read from the precomputed ProductCard"""
+    min_price = serializers.DecimalField(source="card.min_price", max_digits=10, decimal_places=2, read_only=True)
+    max_price = serializers.DecimalField(source="card.max_price", max_digits=10, decimal_places=2, read_only=True)
+    thumbnail_url = serializers.SerializerMethodField()
+    colors = serializers.JSONField(source="card.colors", read_only=True)
+    sizes = serializers.JSONField(source="card.sizes", read_only=True)
+    in_stock = serializers.BooleanField(source="card.in_stock", read_only=True)
+
+    class Meta:
+        model = Product
+        fields = [
+            "id",
+            "badge",
+            "title",
+            "slug",
+            "price",
+            "min_price",
+            "max_price",
+            "thumbnail_url",
+            "colors",
+            "sizes",
+            "in_stock",
+        ]
+        read_only_fields = fields
+
+    def get_thumbnail_url(self, obj):
+        try:
+            url = obj.card.thumbnail_url
+        except ProductCard.DoesNotExist:
+            return None
+        request = self.context.get("request")
+        if url and request:
+            return request.build_absolute_uri(url)
+        return url or None
+
+
+# Bulk catalog import rows (validated without touching the database)
+
+class ImportSizeSerializer(serializers.Serializer):
+    size_label = serializers.CharField(max_length=10)
+    stock = serializers.IntegerField(min_value=0, default=0)
+
+
+class ImportVariantSerializer(serializers.Serializer):
+    color_name = serializers.CharField(max_length=50)
+    hex_code = serializers.CharField(max_length=7, required=False, allow_blank=True, default="")
+    price_override = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True, default=None)
+    sizes = ImportSizeSerializer(many=True, required=False, default=list)
+
+
+class ImportProductSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=255)
+    slug = serializers.SlugField(required=False, allow_blank=True, default="")
+    description = serializers.CharField(required=False, allow_blank=True, default="")
+    badge = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True, default=None)
+    base_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0.01"), required=False, allow_null=True, default=None)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0.01"), required=False, allow_null=True, default=None)
+    category = serializers.CharField(required=False, allow_blank=True, default="")
+    is_active = serializers.BooleanField(required=False, default=True)
+    variants = ImportVariantSerializer(many=True, required=False, default=list)
+
+
+class BulkStockItemSerializer(serializers.Serializer):
+    """One stock change, addressed by size id or by (product slug, color, size label)"""
+    id = serializers.IntegerField(required=False)
+    product = serializers.SlugField(required=False)
+    color = serializers.CharField(max_length=50, required=False)
+    size = serializers.CharField(max_length=10, required=False)
+    stock = serializers.IntegerField(min_value=0, required=False)
+    delta = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if ("stock" in attrs) == ("delta" in attrs):
+            raise serializers.ValidationError("Provide exactly one of 'stock' or 'delta'.")
+        natural_key = [attrs.get(key) for key in ("product", "color", "size")]
+        if "id" not in attrs and not all(natural_key):
+            raise serializers.ValidationError("Provide 'id' or all of 'product', 'color' and 'size'.")
+        return attrs
@@ -0,0 +1,205 @@
+import threading
+
+from django.db import transaction
+from django.contrib.auth import get_user_model
+from django.db.models.functions import Now
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core.storage import track_references
+from users.models import CustomerProfile, VendorProfile
+from .cache import invalidate_categories, invalidate_products
+from .cards import rebuild_product_cards
+from .models import (
+    Category,
+    Product,
+    ProductVariant,
+    ProductSize,
+    ProductImage,
+    ProductMediaItem,
+    ProductMediaSection,
+    SEARCH_SOURCE_FIELDS,
+)
+from .images import enqueue_derivatives
+from .stock import record_stock_change
+from .suggest import record_changes as record_suggest_changes
+
+User = get_user_model()
+
+_pending = threading.local()
+
+# Uploaded images share one content-addressed pool; see core.storage
+track_references(ProductImage, "image")
+track_references(ProductMediaItem, "image")
+track_references(VendorProfile, "shop_logo")
+track_references(CustomerProfile, "profile_picture")
+
+
+def catalog_changed(product_ids=(), slugs=(), category_ids=()):
+    """
+    Refresh everything derived from a product's rows after a write.
+
+    Changes are coalesced until the transaction commits, so saving a product
+    with many variants and sizes rebuilds its derived data once. Signal
+    handlers call this for single-row saves; bulk code paths that bypass
+    signals (bulk_create, queryset.update) must call it themselves.
+    `category_ids` are categories whose active product count may have moved.
+    """
+    if not hasattr(_pending, "product_ids"):
+        _pending.product_ids, _pending.slugs, _pending.category_ids = set(), set(), set()
+    _pending.product_ids.update(pk for pk in product_ids if pk is not None)
+    _pending.slugs.update(slugs)
+    _pending.category_ids.update(pk for pk in category_ids if pk is not None)
+    # Every call registers a flush; the first one to run drains the batch
+    transaction.on_commit(_flush_catalog_changes)
+
+
+def _flush_catalog_changes():
+    product_ids = getattr(_pending, "product_ids", set())
+    slugs = getattr(_pending, "slugs", set())
+    category_ids = getattr(_pending, "category_ids", set())
+    if not product_ids and not slugs and not category_ids:
+        return
+    _pending.product_ids, _pending.slugs, _pending.category_ids = set(), set(), set()
+    if category_ids:
+        Category.objects.filter(pk__in=category_ids).with_ancestors().refresh_product_counts()
+        invalidate_categories()
+    if not product_ids and not slugs:
+        return
+    Product.objects.filter(pk__in=product_ids).refresh_derived_fields()
+    invalidate_products(product_ids=product_ids, slugs=slugs)
+    rebuild_product_cards(product_ids)
+    record_suggest_changes(product_ids)
+
+
+def touch_products(queryset):
+    """
+    Mark products as changed when a related row alters their representation.
+
+    Bumps updated_at, which the detail ETag and Last-Modified are built from,
+    and drops their cached responses.
+    """
+    rows = list(queryset.values_list("pk", "slug"))
+    if not rows:
+        return
+    Product.objects.filter(pk__in=[pk for pk, _ in rows]).update(updated_at=Now())
+    invalidate_products(product_ids=[pk for pk, _ in rows], slugs=[slug for _, slug in rows])
+
+
+def _variant_product_id(variant_id):
+    if not variant_id:
+        return None
+    return ProductVariant.objects.filter(pk=variant_id).values_list("product_id", flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_search_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_SOURCE_FIELDS.intersection(update_fields):
+        return
+    Product.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(post_save, sender=Category)
+def refresh_category_search_vectors(sender, instance, created=False, **kwargs):
+    if not created:
+        Product.objects.filter(category=instance).update_search_vector()
+
+
+@receiver(post_save, sender=VendorProfile)
+def refresh_vendor_search_vectors(sender, instance, **kwargs):
+    Product.objects.filter(vendor_id=instance.user_id).update_search_vector()
+    transaction.on_commit(lambda: record_suggest_changes(full=True))
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, update_fields=None, **kwargs):
+    if instance.pk and (update_fields is None or "username" in update_fields):
+        instance._previous_username = User.objects.filter(pk=instance.pk).values_list("username", flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def vendor_renamed(sender, instance, created=False, **kwargs):
+    # Products show their vendor's username as vendor_name
+    previous = getattr(instance, "_previous_username", None)
+    if not created and previous is not None and previous != instance.username:
+        touch_products(Product.objects.filter(vendor=instance))
+    instance._previous_username = None
+
+
+# Cached responses and product cards
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created=False, **kwargs):
+    category_ids = ()
+    synced = (getattr(instance, "_synced_category_id", None), getattr(instance, "_synced_is_active", None))
+    if created or synced != (instance.category_id, instance.is_active):
+        category_ids = {synced[0], instance.category_id}
+    instance._synced_category_id, instance._synced_is_active = instance.category_id, instance.is_active
+    catalog_changed([instance.pk], slugs=[instance.slug], category_ids=category_ids)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    invalidate_products(product_ids=[instance.pk], slugs=[instance.slug])
+    catalog_changed(category_ids=[instance.category_id])
+    pk = instance.pk
+    transaction.on_commit(lambda: record_suggest_changes([pk]))
+
+
+@receiver([post_save, post_delete], sender=ProductVariant)
+def variant_changed(sender, instance, **kwargs):
+    catalog_changed([instance.product_id])
+
+
+@receiver(post_save, sender=ProductSize)
+def size_saved(sender, instance, **kwargs):
+    catalog_changed([instance.get_product_id()])
+
+
+@receiver(post_delete, sender=ProductSize)
+def size_deleted(sender, instance, **kwargs):
+    product_id = instance.get_product_id()
+    synced = instance._synced_stock
+    record_stock_change(product_id, -synced if synced is not None else None)
+    catalog_changed([product_id])
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def image_changed(sender, instance, **kwargs):
+    catalog_changed([_variant_product_id(instance.variant_id)])
+
+
+@receiver([post_save, post_delete], sender=ProductMediaSection)
+def media_section_changed(sender, instance, **kwargs):
+    catalog_changed([instance.product_id])
+
+
+@receiver([post_save, post_delete], sender=ProductMediaItem)
+def media_item_changed(sender, instance, **kwargs):
+    product_id = ProductMediaSection.objects.filter(pk=instance.section_id).values_list("product_id", flat=True).first()
+    catalog_changed([product_id])
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=ProductMediaItem)
+def image_uploaded(sender, instance, **kwargs):
+    enqueue_derivatives([instance])
+
+
+# pre_delete: by post_delete the products have already been detached (SET_NULL)
+@receiver([post_save, pre_delete], sender=Category)
+def category_changed(sender, instance, **kwargs):
+    invalidate_categories()
+    touch_products(Product.objects.filter(category_id=instance.pk))
+    transaction.on_commit(lambda: record_suggest_changes(full=True))
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    # The SET_NULL cascade detaches the products with a raw UPDATE that skips
+    # ProductQuerySet.update, so their search vectors and the ancestors'
+    # counts are refreshed on commit, once they have been detached
+    product_ids = list(Product.objects.filter(category_id=instance.pk).values_list("pk", flat=True))
+    if product_ids:
+        transaction.on_commit(lambda: Product.objects.filter(pk__in=product_ids).update_search_vector())
+    catalog_changed(category_ids=Category.path_ids(instance.path)[:-1])
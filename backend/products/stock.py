@@ -0,0 +1,123 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from django.dispatch import Signal
+
+_state = threading.local()
+
+# Sent with deltas={product_id: units} when the stock of flash sale products
+# moves outside checkout, so their sale counters (orders.flash_sale) can follow
+flash_sale_stock_changed = Signal()
+
+
+def _dirty():
+    return getattr(_state, "dirty", None)
+
+
+@contextmanager
+def batch_stock_sync():
+    """
+    Suppress per-size stock updates inside the block.
+
+    Products touched by ProductSize writes are collected and reconciled with a
+    single aggregate UPDATE when the outermost block exits. Nested blocks
+    join the outer batch.
+    """
+    if _dirty() is not None:
+        yield
+        return
+
+    _state.dirty = set()
+    try:
+        yield
+        product_ids = _state.dirty
+    finally:
+        _state.dirty = None
+    reconcile_stock(product_ids)
+
+
+def record_stock_change(product_id, delta):
+    """
+    Apply a size-level stock change to its product.
+
+    A delta of None means the previous size stock is unknown, so the product
+    is fully reconciled instead of incremented.
+    """
+    if product_id is None:
+        return
+    dirty = _dirty()
+    if dirty is not None:
+        dirty.add(product_id)
+    elif delta is None:
+        reconcile_stock([product_id])
+    elif delta:
+        from .models import Product
+        if not Product.objects.filter(pk=product_id, flash_sale=False).apply_stock_delta(delta):
+            _update_flash_sale_stock([product_id], lambda products: products.apply_stock_delta(delta))
+
+
+def reconcile_stock(product_ids):
+    """Recompute Product.stock from its sizes in one UPDATE and refresh derived data"""
+    product_ids = [pk for pk in set(product_ids) if pk is not None]
+    if not product_ids:
+        return
+    from .models import Product
+    from .signals import catalog_changed
+    if Product.objects.filter(pk__in=product_ids, flash_sale=False).reconcile_stock() != len(product_ids):
+        _update_flash_sale_stock(product_ids, lambda products: products.reconcile_stock())
+    catalog_changed(product_ids)
+
+
+def _update_flash_sale_stock(product_ids, update):
+    """
+    Run `update` on the flash sale products among `product_ids` and announce
+    how far each one's stock moved.
+
+    The rows are locked while the before and after values are read, so a
+    concurrent write cannot be counted as part of this change.
+    """
+    from .models import Product
+
+    with transaction.atomic():
+        before = dict(
+            Product.objects.select_for_update()
+            .filter(pk__in=product_ids, flash_sale=True)
+            .order_by("pk")
+            .values_list("pk", "stock")
+        )
+        if not before:
+            return
+        update(Product.objects.filter(pk__in=before))
+        after = dict(Product.objects.filter(pk__in=before).values_list("pk", "stock"))
+    deltas = {pk: after[pk] - stock for pk, stock in before.items() if after[pk] != stock}
+    if deltas:
+        flash_sale_stock_changed.send(sender=Product, deltas=deltas)
+
+
+def apply_size_stock_changes(changes, product_ids):
+    """
+    Write many size stock changes with at most two UPDATE statements.
+
+    `changes` maps size id to (absolute, delta): sizes with an absolute value
+    are set to max(absolute + delta, 0), the rest are shifted by delta. The
+    owning products are then reconciled once each.
+    """
+    from .models import ProductSize
+
+    absolute = {pk: max(value + delta, 0) for pk, (value, delta) in changes.items() if value is not None}
+    relative = {pk: delta for pk, (value, delta) in changes.items() if value is None and delta}
+
+    if absolute:
+        ProductSize.objects.filter(pk__in=absolute).update(
+            stock=Case(*[When(pk=pk, then=Value(value)) for pk, value in absolute.items()])
+        )
+    if relative:
+        shift = Case(*[When(pk=pk, then=Value(delta)) for pk, delta in relative.items()])
+        ProductSize.objects.filter(pk__in=relative).update(
+            stock=Greatest(F("stock") + shift, Value(0))
+        )
+
+    reconcile_stock(product_ids)
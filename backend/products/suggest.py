@@ -0,0 +1,176 @@
+"""
+In-process prefix index for search-as-you-type.
+
+Each worker keeps a sorted array of normalized keys over active product
+titles, category names and approved shop names, and answers prefix lookups
+with a binary search, without touching the database. Every word of a label
+starts a key, so "trail running shoe" is found by "run" and "shoe" too.
+
+Workers stay in step through a change log in the shared cache: writes append
+the changed product ids under an increasing sequence number (or a full
+rebuild marker for category and shop changes). At most once per
+SUGGEST_REFRESH_INTERVAL seconds a worker reads the entries it has not seen
+and reloads just those products. If the log has expired or been flushed,
+the worker rebuilds from scratch.
+"""
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import cache
+
+SEQ_KEY = "products:suggest:seq"
+CHANGE_KEY = "products:suggest:change:{}"
+CHANGE_TTL = 60 * 60
+FULL_REBUILD = "*"
+MAX_KEY_WORDS = 8
+MAX_LIMIT = 20
+# A worker further behind than this rebuilds instead of replaying the log
+MAX_PENDING_CHANGES = 500
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.casefold().split())
+
+
+def _label_keys(label):
+    words = normalize(label).split()[:MAX_KEY_WORDS]
+    return {" ".join(words[i:]) for i in range(len(words))}
+
+
+class PrefixIndex:
+    def __init__(self, keys=None, entries=None):
+        # keys: sorted (key, kind, ident); entries: (kind, ident) -> suggestion
+        self.keys = keys or []
+        self.entries = entries or {}
+
+    def copy(self):
+        return PrefixIndex(list(self.keys), dict(self.entries))
+
+    def add(self, kind, ident, suggestion):
+        self.entries[(kind, ident)] = suggestion
+        for key in _label_keys(suggestion["label"]):
+            insort(self.keys, (key, kind, ident))
+
+    def remove(self, kind, ident):
+        suggestion = self.entries.pop((kind, ident), None)
+        if suggestion is None:
+            return
+        for key in _label_keys(suggestion["label"]):
+            i = bisect_left(self.keys, (key, kind, ident))
+            if i < len(self.keys) and self.keys[i] == (key, kind, ident):
+                del self.keys[i]
+
+    def lookup(self, prefix, limit=10):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        results, seen = [], set()
+        i = bisect_left(self.keys, (prefix,))
+        while i < len(self.keys) and len(results) < limit:
+            key, kind, ident = self.keys[i]
+            if not key.startswith(prefix):
+                break
+            if (kind, ident) not in seen:
+                seen.add((kind, ident))
+                results.append(self.entries[(kind, ident)])
+            i += 1
+        return results
+
+
+def _product_suggestion(slug, title):
+    return {"type": "product", "label": title, "slug": slug}
+
+
+def _load_products(index, queryset):
+    for pk, slug, title in queryset.values_list("pk", "slug", "title"):
+        index.add("product", pk, _product_suggestion(slug, title))
+
+
+def build_index():
+    """Build the full index in three queries"""
+    from users.models import VendorProfile
+    from .models import Category, Product
+
+    index = PrefixIndex()
+    _load_products(index, Product.objects.filter(is_active=True))
+    for pk, slug, name in Category.objects.values_list("pk", "slug", "name"):
+        index.add("category", pk, {"type": "category", "label": name, "slug": slug})
+    shops = VendorProfile.objects.filter(approved=True).exclude(shop_name__isnull=True).exclude(shop_name="")
+    for user_id, shop_name in shops.values_list("user_id", "shop_name"):
+        index.add("shop", user_id, {"type": "shop", "label": shop_name, "vendor_id": user_id})
+    return index
+
+
+def apply_product_changes(index, product_ids):
+    """Return a copy of `index` with the given products reloaded"""
+    from .models import Product
+
+    index = index.copy()
+    for pk in product_ids:
+        index.remove("product", pk)
+    _load_products(index, Product.objects.filter(pk__in=product_ids, is_active=True))
+    return index
+
+
+def record_changes(product_ids=(), full=False):
+    """Append to the shared change log so every worker picks the change up"""
+    if not full and not product_ids:
+        return
+    cache.add(SEQ_KEY, 0, timeout=None)
+    seq = cache.incr(SEQ_KEY)
+    cache.set(CHANGE_KEY.format(seq), FULL_REBUILD if full else sorted(product_ids), CHANGE_TTL)
+
+
+class SuggestIndex:
+    """The worker's index, refreshed from the change log on lookup"""
+
+    def __init__(self):
+        self.index = None
+        self.seq = 0
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def rebuild(self):
+        seq = cache.get(SEQ_KEY) or 0
+        self.index, self.seq = build_index(), seq
+        self.checked_at = time.monotonic()
+
+    def refresh(self):
+        interval = getattr(settings, "SUGGEST_REFRESH_INTERVAL", 5)
+        if self.index is not None and time.monotonic() - self.checked_at < interval:
+            return
+        with self.lock:
+            if self.index is None:
+                self.rebuild()
+                return
+            self.checked_at = time.monotonic()
+            seq = cache.get(SEQ_KEY) or 0
+            if seq == self.seq:
+                return
+            if seq < self.seq or seq - self.seq > MAX_PENDING_CHANGES:
+                self.rebuild()
+                return
+            changes = cache.get_many([CHANGE_KEY.format(n) for n in range(self.seq + 1, seq + 1)])
+            if len(changes) != seq - self.seq or FULL_REBUILD in changes.values():
+                # Part of the log expired or was flushed, or a rebuild was requested
+                self.rebuild()
+                return
+            product_ids = {pk for ids in changes.values() for pk in ids}
+            self.index, self.seq = apply_product_changes(self.index, product_ids), seq
+
+    def lookup(self, prefix, limit=10):
+        self.refresh()
+        return self.index.lookup(prefix, min(limit, MAX_LIMIT))
+
+
+suggest_index = SuggestIndex()
+
+
+def warm_index():
+    """Build this worker's index up front instead of on the first request"""
+    suggest_index.rebuild()
@@ -0,0 +1,71 @@
+from celery import shared_task
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+import logging
+
+from .images import generate_derivatives, needs_derivatives
+from .importer import ProductImporter
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+
+@shared_task(bind=True)
+def import_products_task(self, file_name, vendor_id, fmt, chunk_size=500):
+    """Import a vendor catalog file; progress is published as PROGRESS task state"""
+    try:
+        vendor = User.objects.get(id=vendor_id)
+        importer = ProductImporter(
+            vendor,
+            chunk_size=chunk_size,
+            progress=lambda summary: self.update_state(state="PROGRESS", meta=summary),
+        )
+        with default_storage.open(file_name, "rb") as stream:
+            report = importer.run(stream, fmt)
+        logger.info(f"Imported {file_name} for vendor {vendor_id}: {importer.summary()}")
+        return report
+    except User.DoesNotExist:
+        logger.error(f"User with id {vendor_id} not found")
+        raise
+    except Exception as e:
+        logger.error(f"Failed to import {file_name} for vendor {vendor_id}: {str(e)}")
+        raise
+    finally:
+        default_storage.delete(file_name)
+
+
+@shared_task
+def generate_image_derivatives_task(model_label, pk):
+    """Render responsive WebP/AVIF sizes for a ProductImage or ProductMediaItem"""
+    from .signals import catalog_changed
+
+    model = apps.get_model(model_label)
+    try:
+        obj = model.objects.get(pk=pk)
+    except model.DoesNotExist:
+        logger.warning(f"{model_label} {pk} deleted before derivatives were generated")
+        return
+    if not needs_derivatives(obj.image):
+        return
+
+    # Identical uploads share a file, so reuse renditions another row already has
+    reusable = (
+        model.objects.filter(image=obj.image.name, derivatives__source=obj.image.name)
+        .exclude(pk=pk)
+        .values_list("derivatives", flat=True)
+        .first()
+    )
+    try:
+        derivatives = reusable or generate_derivatives(obj.image)
+    except Exception as e:
+        logger.error(f"Failed to generate derivatives for {model_label} {pk}: {str(e)}")
+        raise
+
+    # Only record them if the image was not replaced while we were rendering
+    model.objects.filter(pk=pk, image=obj.image.name).update(derivatives=derivatives)
+    if model_label == "products.ProductImage" and obj.variant_id:
+        catalog_changed([obj.variant.product_id])
+    elif model_label == "products.ProductMediaItem":
+        catalog_changed([obj.section.product_id])
+    logger.info(f"Generated derivatives for {model_label} {pk}")
@@ -0,0 +1,167 @@
+import pytest
+from rest_framework.test import APIClient
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from products.models import Category, Product, ProductVariant, ProductSize
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_detail_is_cached_and_invalidated_by_size_change(django_assert_num_queries, django_capture_on_commit_callbacks):
+    vendor = User.objects.create_user(
+        username="vendor", email="vendor@test.com", password="pass1234", role="vendor"
+    )
+    product = Product.objects.create(title="Runner", price=50, vendor=vendor)
+    variant = ProductVariant.objects.create(product=product, color_name="Red")
+    size = ProductSize.objects.create(variant=variant, size_label="42", stock=3)
+
+    client = APIClient()
+    url = f"/api/products/{product.slug}/"
+    assert client.get(url).data["stock"] == 3
+    with django_assert_num_queries(0):
+        assert client.get(url).data["stock"] == 3
+
+    with django_capture_on_commit_callbacks(execute=True):
+        size.stock = 7
+        size.save()
+
+    assert client.get(url).data["stock"] == 7
+
+
+@pytest.mark.django_db
+def test_list_cache_is_keyed_on_query_and_invalidated_by_new_products(django_capture_on_commit_callbacks):
+    vendor = User.objects.create_user(
+        username="vendor", email="vendor@test.com", password="pass1234", role="vendor"
+    )
+    Product.objects.create(title="Runner", price=50, vendor=vendor)
+
+    client = APIClient()
+    assert client.get("/api/products/").data["count"] == 1
+    assert client.get("/api/products/", {"q": "walker"}).data["count"] == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Product.objects.create(title="Walker", price=40, vendor=vendor)
+
+    assert client.get("/api/products/").data["count"] == 2
+    assert client.get("/api/products/", {"q": "walker"}).data["count"] == 1
+
+
+@pytest.mark.django_db
+def test_category_list_is_cached_with_etag_and_counts(django_assert_num_queries, django_capture_on_commit_callbacks):
+    vendor = User.objects.create_user(
+        username="counter", email="counter@test.com", password="pass1234", role="vendor"
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        shoes = Category.objects.create(name="Shoes", slug="shoes")
+        bags = Category.objects.create(name="Bags", slug="bags")
+        shoe = Product.objects.create(title="Runner", price=50, category=shoes, vendor=vendor)
+        Product.objects.create(title="Hidden", price=50, category=shoes, vendor=vendor, is_active=False)
+
+    client = APIClient()
+    response = client.get("/api/categories/")
+    counts = {c["slug"]: c["active_product_count"] for c in response.data["results"]}
+    assert counts == {"shoes": 1, "bags": 0}
+    etag = response["ETag"]
+
+    with django_assert_num_queries(0):
+        cached = client.get("/api/categories/", HTTP_IF_NONE_MATCH=etag)
+    assert cached.status_code == 304
+
+    with django_capture_on_commit_callbacks(execute=True):
+        shoe.category = bags
+        shoe.save()
+    response = client.get("/api/categories/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert {c["slug"]: c["active_product_count"] for c in response.data["results"]} == {"shoes": 0, "bags": 1}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Product.objects.filter(pk=shoe.pk).update(is_active=False)
+    assert Category.objects.get(pk=bags.pk).active_product_count == 0
+
+
+@pytest.mark.django_db
+def test_detail_conditional_get_returns_304_after_one_query(django_assert_num_queries, django_capture_on_commit_callbacks):
+    vendor = User.objects.create_user(
+        username="etag", email="etag@test.com", password="pass1234", role="vendor"
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        product = Product.objects.create(title="Runner", price=50, vendor=vendor)
+        variant = ProductVariant.objects.create(product=product, color_name="Red")
+        size = ProductSize.objects.create(variant=variant, size_label="42", stock=3)
+
+    client = APIClient()
+    url = f"/api/products/{product.slug}/"
+    response = client.get(url)
+    etag, last_modified = response["ETag"], response["Last-Modified"]
+
+    with django_assert_num_queries(0):
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    cache.clear()
+    with django_assert_num_queries(1):
+        assert client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 304
+
+    # A size change bumps the product's timestamp, so the old ETag no longer matches
+    with django_capture_on_commit_callbacks(execute=True):
+        size.stock = 0
+        size.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_vendor_rename_and_category_change_invalidate_the_detail_etag(django_capture_on_commit_callbacks):
+    vendor = User.objects.create_user(
+        username="renamed", email="renamed@test.com", password="pass1234", role="vendor"
+    )
+    category = Category.objects.create(name="Trail")
+    with django_capture_on_commit_callbacks(execute=True):
+        product = Product.objects.create(title="Climber", price=50, vendor=vendor, category=category)
+
+    client = APIClient()
+    url = f"/api/products/{product.slug}/"
+    etag = client.get(url)["ETag"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        vendor.username = "renamed-store"
+        vendor.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data["vendor_name"] == "renamed-store"
+
+    etag = response["ETag"]
+    with django_capture_on_commit_callbacks(execute=True):
+        category.name = "Mountain"
+        category.save()
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_batch_reads_cached_products_and_loads_only_misses(django_assert_num_queries, django_capture_on_commit_callbacks):
+    vendor = User.objects.create_user(
+        username="batch", email="batch@test.com", password="pass1234", role="vendor"
+    )
+    products = [Product.objects.create(title=f"Shoe {i}", price=50, vendor=vendor) for i in range(3)]
+    for product in products:
+        ProductVariant.objects.create(product=product, color_name="Red")
+    ids = [p.pk for p in products]
+    client = APIClient()
+
+    # One page query + variants, images and sizes prefetches
+    with django_assert_num_queries(4):
+        response = client.get("/api/products/batch/", {"ids": f"{ids[2]},{ids[0]},999999"})
+    assert [p["id"] for p in response.data["results"]] == [ids[2], ids[0]]
+
+    with django_assert_num_queries(4):  # only ids[1] is a miss
+        response = client.get("/api/products/batch/", {"ids": ",".join(map(str, ids))})
+    assert [p["title"] for p in response.data["results"]] == ["Shoe 0", "Shoe 1", "Shoe 2"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        products[0].title = "Renamed"
+        products[0].save()
+    with django_assert_num_queries(4):
+        response = client.get("/api/products/batch/", {"ids": ",".join(map(str, ids))})
+    assert response.data["results"][0]["title"] == "Renamed"
+
+    assert client.get("/api/products/batch/", {"ids": "1,x"}).status_code == 400
@@ -0,0 +1,48 @@
+import pytest
+from decimal import Decimal
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from products.models import Product, ProductVariant, ProductSize
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_card_view_reads_precomputed_documents(django_assert_num_queries, django_capture_on_commit_callbacks):
+    vendor = User.objects.create_user(
+        username="vendor", email="vendor@test.com", password="pass1234", role="vendor"
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        product = Product.objects.create(title="Runner", price=50, vendor=vendor)
+        red = ProductVariant.objects.create(product=product, color_name="Red", hex_code="#ff0000")
+        blue = ProductVariant.objects.create(product=product, color_name="Blue", price_override=65)
+        ProductSize.objects.create(variant=red, size_label="42", stock=0)
+        ProductSize.objects.create(variant=blue, size_label="43", stock=2)
+
+    product.card.refresh_from_db()
+    assert product.card.min_price == Decimal("50.00")
+    assert product.card.max_price == Decimal("65.00")
+    assert product.card.sizes == ["43"]
+    assert product.card.in_stock is True
+
+    with django_assert_num_queries(2):  # COUNT(*) + one joined page query
+        response = APIClient().get("/api/products/", {"view": "card"})
+
+    card = response.data["results"][0]
+    assert card["colors"] == [{"name": "Red", "hex": "#ff0000"}, {"name": "Blue", "hex": ""}]
+    assert card["min_price"] == "50.00"
+    assert "variants" not in card
+
+
+@pytest.mark.django_db
+def test_card_keeps_a_zero_price_override(django_capture_on_commit_callbacks):
+    vendor = User.objects.create_user(
+        username="vendor", email="vendor@test.com", password="pass1234", role="vendor"
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        product = Product.objects.create(title="Sample", price=50, vendor=vendor)
+        ProductVariant.objects.create(product=product, color_name="Red", price_override=Decimal("0"))
+
+    product.card.refresh_from_db()
+    assert product.card.min_price == Decimal("0.00")
+    assert product.card.max_price == Decimal("0.00")
@@ -0,0 +1,99 @@
+from io import StringIO
+
+import pytest
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.exceptions import ValidationError
+from products.models import Product, Category
+
+User = get_user_model()
+
+
+@pytest.fixture
+def vendor():
+    return User.objects.create_user(
+        username="vendor", email="vendor@test.com", password="pass1234", role="vendor"
+    )
+
+
+@pytest.mark.django_db
+def test_category_filter_includes_descendants(vendor, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        sneakers = Category.objects.create(name="Sneakers", slug="sneakers")
+        running = Category.objects.create(name="Running", slug="running", parent=sneakers)
+        trail = Category.objects.create(name="Trail", slug="trail", parent=running)
+        boots = Category.objects.create(name="Boots", slug="boots")
+        Product.objects.create(title="Trail Shoe", price=50, category=trail, vendor=vendor)
+        Product.objects.create(title="Court Shoe", price=50, category=sneakers, vendor=vendor)
+        Product.objects.create(title="Hiker", price=50, category=boots, vendor=vendor)
+
+    assert trail.path == f"{sneakers.pk}/{running.pk}/{trail.pk}/"
+    client = APIClient()
+    titles = lambda slug: sorted(p["title"] for p in client.get("/api/products/", {"category": slug}).data["results"])
+    assert titles("sneakers") == ["Court Shoe", "Trail Shoe"]
+    assert titles("running") == ["Trail Shoe"]
+    assert Category.objects.get(pk=sneakers.pk).active_product_count == 2
+
+    # Moving a subtree rewrites its paths and counts in place
+    running.parent = boots
+    running.save()
+    trail.refresh_from_db()
+    assert trail.path == f"{boots.pk}/{running.pk}/{trail.pk}/"
+    assert titles("boots") == ["Hiker", "Trail Shoe"]
+    assert Category.objects.get(pk=sneakers.pk).active_product_count == 1
+    assert Category.objects.get(pk=boots.pk).active_product_count == 2
+
+
+@pytest.mark.django_db
+def test_category_cannot_move_under_its_descendant():
+    sneakers = Category.objects.create(name="Sneakers", slug="sneakers")
+    running = Category.objects.create(name="Running", slug="running", parent=sneakers)
+
+    sneakers.parent = running
+    with pytest.raises(ValidationError) as excinfo:
+        sneakers.full_clean()
+    assert "parent" in excinfo.value.message_dict
+
+
+@pytest.mark.django_db
+def test_populate_categories_seeds_the_tree_and_reparents_existing_ones():
+    Category.objects.create(name="Running", slug="running")
+
+    call_command("populate_categories", stdout=StringIO())
+    call_command("populate_categories", stdout=StringIO())
+
+    sneakers = Category.objects.get(name="Sneakers")
+    assert Category.objects.get(name="Running").parent == sneakers
+    assert Category.objects.get(name="Dress Shoes").parent.name == "Formal"
+    assert Category.objects.filter(parent__isnull=True).count() == 5
+
+
+@pytest.mark.django_db
+def test_deleting_a_category_recounts_its_ancestors(vendor, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        root = Category.objects.create(name="Root", slug="root")
+        child = Category.objects.create(name="Child", slug="child", parent=root)
+        Product.objects.create(title="Shoe", price=50, category=child, vendor=vendor)
+    assert Category.objects.get(pk=root.pk).active_product_count == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        child.delete()
+    assert Category.objects.get(pk=root.pk).active_product_count == 0
+
+
+@pytest.mark.django_db
+def test_bulk_update_recounts_old_and_new_categories(vendor, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        boots = Category.objects.create(name="Boots", slug="boots")
+        sandals = Category.objects.create(name="Sandals", slug="sandals")
+        hiker = Product.objects.create(title="Hiker", price=50, category=boots, vendor=vendor)
+        slide = Product.objects.create(title="Slide", price=20, category=sandals, vendor=vendor)
+
+    hiker.category = sandals
+    slide.is_active = False
+    with django_capture_on_commit_callbacks(execute=True):
+        Product.objects.bulk_update([hiker, slide], ["category", "is_active"])
+
+    assert Category.objects.get(pk=boots.pk).active_product_count == 0
+    assert Category.objects.get(pk=sandals.pk).active_product_count == 1
@@ -0,0 +1,44 @@
+import pytest
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from products.models import Product, Category, ProductVariant, ProductSize
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_facets_follow_filter_and_search_in_one_query(django_assert_num_queries, django_capture_on_commit_callbacks):
+    vendor = User.objects.create_user(
+        username="vendor", email="vendor@test.com", password="pass1234", role="vendor"
+    )
+    shoes = Category.objects.create(name="Shoes", slug="shoes")
+    bags = Category.objects.create(name="Bags", slug="bags")
+    runner = Product.objects.create(title="Running Shoe", price=40, category=shoes, vendor=vendor)
+    trail = Product.objects.create(title="Trail Running Shoe", price=120, category=shoes, vendor=vendor)
+    Product.objects.create(title="Running Bag", price=30, category=bags, vendor=vendor)
+    for product, color in [(runner, "Red"), (runner, "Blue"), (trail, "Red")]:
+        variant = ProductVariant.objects.create(product=product, color_name=color)
+        ProductSize.objects.create(variant=variant, size_label="42", stock=1)
+        ProductSize.objects.create(variant=variant, size_label="43", stock=0)
+
+    client = APIClient()
+    with django_assert_num_queries(2):  # category path + the facet query
+        response = client.get("/api/products/facets/", {"q": "running", "category": "shoes"})
+
+    assert response.status_code == 200
+    assert response.data["total"] == 2
+    assert response.data["categories"] == [{"slug": "shoes", "name": "Shoes", "count": 2}]
+    assert response.data["colors"] == [{"value": "Red", "count": 2}, {"value": "Blue", "count": 1}]
+    assert response.data["sizes"] == [{"value": "42", "count": 2}]
+    assert response.data["price_ranges"] == [
+        {"min": 25, "max": 50, "count": 1},
+        {"min": 100, "max": 200, "count": 1},
+    ]
+
+    # Paging/ordering params share the cached entry; catalog writes invalidate it
+    with django_assert_num_queries(0):
+        client.get("/api/products/facets/", {"category": "shoes", "q": "running", "page": 2})
+    with django_capture_on_commit_callbacks(execute=True):
+        Product.objects.create(title="Running Sandal", price=20, category=shoes, vendor=vendor)
+    response = client.get("/api/products/facets/", {"q": "running", "category": "shoes"})
+    assert response.data["total"] == 3
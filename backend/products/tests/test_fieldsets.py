@@ -0,0 +1,46 @@
+import pytest
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from products.models import Product, Category, ProductVariant, ProductSize
+
+User = get_user_model()
+
+
+@pytest.fixture
+def catalog():
+    vendor = User.objects.create_user(
+        username="vendor", email="vendor@test.com", password="pass1234", role="vendor"
+    )
+    shoes = Category.objects.create(name="Shoes", slug="shoes")
+    for i in range(3):
+        product = Product.objects.create(title=f"Shoe {i}", price=50, category=shoes, vendor=vendor)
+        variant = ProductVariant.objects.create(product=product, color_name="Red")
+        ProductSize.objects.create(variant=variant, size_label="42", stock=1)
+    return vendor
+
+
+@pytest.mark.django_db
+def test_sparse_fields_skip_relations(catalog, django_assert_num_queries):
+    with django_assert_num_queries(2):  # COUNT(*) + page, no prefetches
+        response = APIClient().get("/api/products/", {"fields": "id,title,category", "expand": ""})
+
+    assert response.status_code == 200
+    product = response.data["results"][0]
+    assert set(product) == {"id", "title", "category"}
+    assert product["category"] == Category.objects.get().pk
+
+
+@pytest.mark.django_db
+def test_expand_controls_nested_relations(catalog, django_assert_num_queries):
+    with django_assert_num_queries(4):  # COUNT(*) + page (with vendor) + variants + sizes
+        response = APIClient().get("/api/products/", {"expand": "variants.sizes"})
+
+    product = response.data["results"][0]
+    assert product["vendor_name"] == "vendor"
+    assert isinstance(product["category"], int)
+    assert product["variants"][0]["sizes"][0]["size_label"] == "42"
+    assert "images" not in product["variants"][0]
+
+    response = APIClient().get("/api/products/", {"fields": "id,nope", "expand": "vendor"})
+    assert response.status_code == 400
+    assert set(response.data) == {"fields", "expand"}
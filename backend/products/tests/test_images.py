@@ -0,0 +1,94 @@
+import pytest
+from io import BytesIO
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from products.images import srcset_map, supported_formats
+from products.models import Product, ProductVariant, ProductImage
+from products.tasks import generate_image_derivatives_task
+
+User = get_user_model()
+
+
+def make_jpeg(width, height):
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), "red").save(buffer, format="JPEG")
+    return SimpleUploadedFile("shoe.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+
+@pytest.mark.django_db
+def test_derivatives_are_generated_without_upscaling(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    vendor = User.objects.create_user(
+        username="vendor", email="vendor@test.com", password="pass1234", role="vendor"
+    )
+    product = Product.objects.create(title="Runner", price=50, vendor=vendor)
+    variant = ProductVariant.objects.create(product=product, color_name="Red")
+    image = ProductImage.objects.create(variant=variant, image=make_jpeg(800, 400))
+
+    generate_image_derivatives_task("products.ProductImage", image.pk)
+
+    image.refresh_from_db()
+    webp = image.derivatives["formats"]["webp"]
+    assert [r["width"] for r in webp] == [320, 640, 800]
+    assert webp[0]["height"] == 160
+    assert set(image.derivatives["formats"]) == set(supported_formats())
+    assert all(image.image.storage.exists(r["name"]) for r in webp)
+    assert srcset_map(image.image)["webp"].endswith(" 800w")
+
+    # A replaced image invalidates the stored renditions
+    image.image = make_jpeg(100, 100)
+    image.save()
+    assert srcset_map(image.image) == {}
+
+
+@pytest.mark.django_db
+def test_identical_uploads_share_one_refcounted_file(settings, tmp_path, django_capture_on_commit_callbacks):
+    settings.MEDIA_ROOT = tmp_path
+    vendor = User.objects.create_user(
+        username="vendor", email="vendor@test.com", password="pass1234", role="vendor"
+    )
+    product = Product.objects.create(title="Runner", price=50, vendor=vendor)
+    red = ProductVariant.objects.create(product=product, color_name="Red")
+    blue = ProductVariant.objects.create(product=product, color_name="Blue")
+    first = ProductImage.objects.create(variant=red, image=make_jpeg(64, 64))
+    second = ProductImage.objects.create(variant=blue, image=make_jpeg(64, 64))
+
+    assert first.image.name == second.image.name
+    assert first.image.name.startswith("cas/")
+    storage = first.image.storage
+    assert len(storage.listdir(first.image.name.rsplit("/", 1)[0])[1]) == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        first.delete()
+    assert storage.exists(second.image.name)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        second.delete()
+    assert not storage.exists(second.image.name)
+
+
+@pytest.mark.django_db
+def test_replacing_a_legacy_image_drops_its_renditions(settings, tmp_path, monkeypatch, django_capture_on_commit_callbacks):
+    settings.MEDIA_ROOT = tmp_path
+    # Rendering the replacement is not under test; keep it off the broker
+    monkeypatch.setattr(generate_image_derivatives_task, "delay", lambda *args: None)
+    vendor = User.objects.create_user(
+        username="vendor", email="vendor@test.com", password="pass1234", role="vendor"
+    )
+    product = Product.objects.create(title="Runner", price=50, vendor=vendor)
+    variant = ProductVariant.objects.create(product=product, color_name="Red")
+    storage = ProductImage._meta.get_field("image").storage
+    legacy = storage.save("products/legacy.jpg", make_jpeg(400, 400))
+    image = ProductImage.objects.create(variant=variant, image=legacy)
+    generate_image_derivatives_task("products.ProductImage", image.pk)
+    image.refresh_from_db()
+    renditions = [r["name"] for r in image.derivatives["formats"]["webp"]]
+    assert all(storage.exists(name) for name in renditions)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        image.image = make_jpeg(64, 64)
+        image.save()
+
+    assert not any(storage.exists(name) for name in renditions)
+    assert storage.exists(legacy)
@@ -0,0 +1,83 @@
+import io
+import json
+import pytest
+from django.contrib.auth import get_user_model
+from products.importer import ProductImporter
+from products.models import Category, Product, ProductSize
+
+User = get_user_model()
+
+CSV = """slug,title,price,category,color_name,price_override,size_label,stock
+runner,Runner,50,sneakers,Red,,42,3
+runner,Runner,50,sneakers,Red,,43,2
+runner,Runner,50,sneakers,Blue,55,42,1
+walker,Walker,40,unknown,Black,,41,1
+,,abc,,,,,
+boot,Boot,90,,Brown,,44,4
+"""
+
+
+@pytest.fixture
+def vendor():
+    return User.objects.create_user(
+        username="vendor", email="vendor@test.com", password="pass1234", role="vendor"
+    )
+
+
+@pytest.mark.django_db
+def test_csv_import_creates_products_and_reports_row_errors(vendor):
+    Category.objects.create(name="Sneakers", slug="sneakers")
+
+    report = ProductImporter(vendor, chunk_size=2).run(io.BytesIO(CSV.encode()), "csv")
+
+    assert (report["created"], report["updated"], report["failed"]) == (2, 0, 2)
+    assert [error["line"] for error in report["errors"]] == [5, 6]
+    runner = Product.objects.get(slug="runner")
+    assert runner.category.slug == "sneakers"
+    assert runner.stock == 6
+    assert runner.variants.get(color_name="Blue").price_override == 55
+
+
+@pytest.mark.django_db
+def test_jsonl_import_upserts_by_vendor_and_slug(vendor):
+    other = User.objects.create_user(
+        username="other", email="other@test.com", password="pass1234", role="vendor"
+    )
+    Product.objects.create(title="Taken", slug="taken", price=10, vendor=other)
+
+    def jsonl(*products):
+        return io.BytesIO("\n".join(json.dumps(p) for p in products).encode())
+
+    first = {"title": "Runner", "price": "50", "variants": [{"color_name": "Red", "sizes": [{"size_label": "42", "stock": 5}]}]}
+    ProductImporter(vendor).run(jsonl(first), "jsonl")
+
+    first["variants"][0]["sizes"] = [{"size_label": "42", "stock": 1}, {"size_label": "43", "stock": 2}]
+    report = ProductImporter(vendor).run(jsonl(first, {"title": "Taken", "price": "10"}), "jsonl")
+
+    assert (report["created"], report["updated"], report["failed"]) == (0, 1, 1)
+    runner = Product.objects.get(slug="runner", vendor=vendor)
+    assert runner.stock == 3
+    assert ProductSize.objects.filter(variant__product=runner).count() == 2
+
+
+@pytest.mark.django_db
+def test_slug_taken_by_another_vendor_during_the_import_is_not_overwritten(vendor, monkeypatch):
+    other = User.objects.create_user(
+        username="other", email="other@test.com", password="pass1234", role="vendor"
+    )
+    resolve = ProductImporter.resolve
+
+    def resolve_then_race(self, rows):
+        resolved = resolve(self, rows)
+        if not Product.objects.filter(slug="raced").exists():
+            Product.objects.create(title="Raced", slug="raced", price=10, vendor=other)
+        return resolved
+
+    monkeypatch.setattr(ProductImporter, "resolve", resolve_then_race)
+    products = [{"title": "Raced", "price": "50"}, {"title": "Runner", "price": "50"}]
+    stream = io.BytesIO("\n".join(json.dumps(p) for p in products).encode())
+    report = ProductImporter(vendor).run(stream, "jsonl")
+
+    assert (report["created"], report["updated"], report["failed"]) == (1, 0, 1)
+    assert "another vendor" in report["errors"][0]["errors"]["slug"][0]
+    assert Product.objects.filter(slug="runner", vendor=vendor).exists()
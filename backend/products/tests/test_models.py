@@ -1,5 +1,11 @@
 import pytest
-from products.models import Product
+from decimal import Decimal
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from products.models import Product, ProductVariant
+
+User = get_user_model()
+
 
 @pytest.mark.django_db
 def test_product_stock_reduces_correctly():
@@ -10,3 +16,57 @@ def test_product_stock_reduces_correctly():
     product.stock -= 2
     product.save()
     assert product.stock == 8
+
+
+def test_validate_image_rejects_oversized_dimensions_from_header(settings):
+    from io import BytesIO
+    from PIL import Image
+    from django.core.exceptions import ValidationError
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from products.validators import validate_image
+
+    buffer = BytesIO()
+    Image.new("RGB", (40, 30)).save(buffer, format="PNG")
+    upload = SimpleUploadedFile("big.png", buffer.getvalue(), content_type="image/png")
+
+    settings.MAX_IMAGE_PIXELS = 1200
+    validate_image(upload)
+    assert upload.tell() == 0
+
+    settings.MAX_IMAGE_PIXELS = 1199
+    with pytest.raises(ValidationError):
+        validate_image(upload)
+
+    with pytest.raises(ValidationError):
+        validate_image(SimpleUploadedFile("fake.png", b"not an image", content_type="image/png"))
+
+
+@pytest.mark.django_db
+def test_effective_price_follows_variant_overrides_and_filters(django_capture_on_commit_callbacks):
+    vendor = User.objects.create_user(
+        username="pricer", email="pricer@test.com", password="pass1234", role="vendor"
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        Product.objects.create(title="Cheap", price=20, vendor=vendor)
+        mixed = Product.objects.create(title="Mixed", price=80, vendor=vendor)
+        ProductVariant.objects.create(product=mixed, color_name="Red")
+        sale = ProductVariant.objects.create(product=mixed, color_name="Blue", price_override=30)
+        Product.objects.create(title="Premium", base_price=150, vendor=vendor)
+
+    mixed.refresh_from_db()
+    assert (mixed.min_effective_price, mixed.max_effective_price) == (Decimal("30.00"), Decimal("80.00"))
+
+    client = APIClient()
+    response = client.get("/api/products/", {"price_min": 25, "price_max": 40, "ordering": "min_effective_price"})
+    assert [p["title"] for p in response.data["results"]] == ["Mixed"]
+
+    response = client.get("/api/products/", {"pagination": "cursor", "ordering": "-min_effective_price", "page_size": 2})
+    assert [p["title"] for p in response.data["results"]] == ["Premium", "Mixed"]
+    response = client.get(response.data["next"])
+    assert [p["title"] for p in response.data["results"]] == ["Cheap"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        sale.delete()
+    mixed.refresh_from_db()
+    assert mixed.min_effective_price == Decimal("80.00")
+    assert client.get("/api/products/", {"price_max": 40}).data["count"] == 1
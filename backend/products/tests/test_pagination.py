@@ -0,0 +1,39 @@
+import pytest
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from products.models import Product
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_cursor_pagination_walks_forward_and_back_without_count():
+    vendor = User.objects.create_user(
+        username="vendor", email="vendor@test.com", password="pass1234", role="vendor"
+    )
+    for i, price in enumerate([30, None, 10, 30, 20]):
+        Product.objects.create(title=f"Shoe {i}", base_price=price, price=price or 5, vendor=vendor)
+
+    client = APIClient()
+    response = client.get("/api/products/", {"pagination": "cursor", "ordering": "base_price", "page_size": 2})
+    assert "count" not in response.data
+    assert response.data["previous"] is None
+
+    seen = []
+    pages = [response.data]
+    while True:
+        seen += [p["base_price"] for p in response.data["results"]]
+        if not response.data["next"]:
+            break
+        response = client.get(response.data["next"])
+        pages.append(response.data)
+    assert seen == ["10.00", "20.00", "30.00", "30.00", None]
+
+    back = client.get(pages[-1]["previous"])
+    assert back.data["results"] == pages[-2]["results"]
+
+
+@pytest.mark.django_db
+def test_cursor_pagination_rejects_tampered_cursor():
+    response = APIClient().get("/api/products/", {"cursor": "not-a-cursor"})
+    assert response.status_code == 404
@@ -1,3 +1,4 @@
+import json
 import pytest
 from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
@@ -40,3 +41,47 @@ def test_vendor_can_create_product():
     # 5. Assertions
     assert response.status_code == 201, response.data
     assert Product.objects.filter(title="T-Shirt", vendor=vendor_profile).exists()
+
+
+@pytest.mark.django_db
+def test_product_creation_query_count_does_not_grow_with_variants(django_assert_max_num_queries, settings, tmp_path):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from io import BytesIO
+    from PIL import Image
+    from products.models import ProductImage
+
+    settings.MEDIA_ROOT = tmp_path
+    vendor_user = User.objects.create_user(
+        username="vendor", email="vendor@test.com", password="pass1234", role="vendor"
+    )
+    client = APIClient()
+    client.force_authenticate(user=vendor_user)
+
+    def upload(name):
+        buffer = BytesIO()
+        Image.new("RGB", (4, 4)).save(buffer, format="PNG")
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+    variants = [
+        {"color_name": f"Color {i}", "sizes": [{"size_label": str(40 + j), "stock": 2} for j in range(8)]}
+        for i in range(5)
+    ]
+    payload = {
+        "title": "Runner",
+        "price": "50.00",
+        "base_price": "50.00",
+        "variants": json.dumps(variants),
+        "variant_0_image_0": upload("a.png"),
+        "variant_0_image_1": upload("b.png"),
+        "variant_4_image_0": upload("c.png"),
+    }
+
+    # Each uploaded file also takes its stored-name lock (core.storage)
+    with django_assert_max_num_queries(23):
+        response = client.post("/api/vendor/products/", payload, format="multipart")
+
+    assert response.status_code == 201, response.data
+    product = Product.objects.get(slug="runner")
+    assert product.stock == 80
+    assert product.variants.count() == 5
+    assert ProductImage.objects.filter(variant__product=product).count() == 3
@@ -0,0 +1,52 @@
+import pytest
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from products.models import Product, Category
+
+User = get_user_model()
+
+
+@pytest.fixture
+def vendor():
+    return User.objects.create_user(
+        username="vendor", email="vendor@test.com", password="pass1234", role="vendor"
+    )
+
+
+@pytest.mark.django_db
+def test_search_ranks_title_matches_first(vendor):
+    Product.objects.create(title="Trail Shoe", description="Great for running", price=50, vendor=vendor)
+    Product.objects.create(title="Running Shoe", description="Light", price=60, vendor=vendor)
+    Product.objects.create(title="Dress Shoe", description="Leather", price=70, vendor=vendor)
+
+    response = APIClient().get("/api/products/", {"q": "running"})
+
+    assert response.status_code == 200
+    titles = [p["title"] for p in response.data["results"]]
+    assert titles == ["Running Shoe", "Trail Shoe"]
+
+
+@pytest.mark.django_db
+def test_search_vector_follows_bulk_edits_and_category_renames(vendor):
+    category = Category.objects.create(name="Boots", slug="boots")
+    product = Product.objects.create(title="Old Name", price=50, vendor=vendor, category=category)
+
+    Product.objects.filter(pk=product.pk).update(title="Canvas Sneaker")
+    category.name = "Outdoor"
+    category.save()
+
+    client = APIClient()
+    assert client.get("/api/products/", {"q": "canvas"}).data["count"] == 1
+    assert client.get("/api/products/", {"search": "outdoor"}).data["count"] == 1
+    assert client.get("/api/products/", {"q": "old"}).data["count"] == 0
+
+
+@pytest.mark.django_db
+def test_deleted_category_name_no_longer_matches(vendor, django_capture_on_commit_callbacks):
+    category = Category.objects.create(name="Trailrun", slug="trailrun")
+    Product.objects.create(title="Shoe", price=50, vendor=vendor, category=category)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        category.delete()
+
+    assert APIClient().get("/api/products/", {"q": "trailrun"}).data["count"] == 0
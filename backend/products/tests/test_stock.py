@@ -0,0 +1,116 @@
+import pytest
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from products.models import Product, ProductVariant, ProductSize
+from products.stock import batch_stock_sync
+
+User = get_user_model()
+
+
+@pytest.fixture
+def product():
+    vendor = User.objects.create_user(
+        username="vendor", email="vendor@test.com", password="pass1234", role="vendor"
+    )
+    return Product.objects.create(title="Runner", price=50, vendor=vendor)
+
+
+def stock_of(product):
+    return Product.objects.values_list("stock", flat=True).get(pk=product.pk)
+
+
+@pytest.mark.django_db
+def test_size_writes_apply_deltas_to_product_stock(product):
+    variant = ProductVariant.objects.create(product=product, color_name="Red")
+    small = ProductSize.objects.create(variant=variant, size_label="40", stock=4)
+    large = ProductSize.objects.create(variant=variant, size_label="44", stock=6)
+    assert stock_of(product) == 10
+
+    small = ProductSize.objects.get(pk=small.pk)
+    small.stock = 1
+    small.save()
+    assert stock_of(product) == 7
+
+    large.delete()
+    assert stock_of(product) == 1
+
+    variant.delete()
+    assert stock_of(product) == 0
+
+
+@pytest.mark.django_db
+def test_batch_mode_reconciles_once(product):
+    variant = ProductVariant.objects.create(product=product, color_name="Red")
+
+    with batch_stock_sync():
+        for label in range(36, 46):
+            ProductSize.objects.create(variant=variant, size_label=str(label), stock=3)
+        assert stock_of(product) == 0
+
+    assert stock_of(product) == 30
+
+
+@pytest.mark.django_db
+def test_bulk_stock_endpoint_applies_updates_for_owned_sizes_only(product, django_assert_max_num_queries):
+
+    red = ProductVariant.objects.create(product=product, color_name="Red")
+    s42 = ProductSize.objects.create(variant=red, size_label="42", stock=5)
+    s43 = ProductSize.objects.create(variant=red, size_label="43", stock=5)
+    other_vendor = User.objects.create_user(
+        username="other", email="other@test.com", password="pass1234", role="vendor"
+    )
+    other = Product.objects.create(title="Other", price=10, vendor=other_vendor)
+    foreign = ProductSize.objects.create(
+        variant=ProductVariant.objects.create(product=other, color_name="Red"), size_label="42", stock=1
+    )
+
+    client = APIClient()
+    client.force_authenticate(user=product.vendor)
+    updates = [
+        {"id": s42.pk, "stock": 10},
+        {"product": product.slug, "color": "Red", "size": "43", "delta": -2},
+        {"id": s42.pk, "delta": -1},
+    ]
+    with django_assert_max_num_queries(10):
+        response = client.post("/api/vendor/sizes/bulk-stock/", updates, format="json")
+
+    assert response.status_code == 200, response.data
+    assert ProductSize.objects.get(pk=s42.pk).stock == 9
+    assert ProductSize.objects.get(pk=s43.pk).stock == 3
+    assert stock_of(product) == 12
+
+    response = client.post("/api/vendor/sizes/bulk-stock/", {"updates": [{"id": foreign.pk, "stock": 0}]}, format="json")
+    assert response.status_code == 400
+    assert ProductSize.objects.get(pk=foreign.pk).stock == 1
+
+    # Only the bulk action is routed, not the viewset's CRUD
+    assert client.post("/api/vendor/sizes/", {"size_label": "44"}, format="json").status_code == 404
+
+
+@pytest.mark.django_db
+def test_availability_arrays_back_size_and_color_filters(django_capture_on_commit_callbacks):
+    vendor = User.objects.create_user(
+        username="sizer", email="sizer@test.com", password="pass1234", role="vendor"
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        runner = Product.objects.create(title="Runner", price=50, vendor=vendor)
+        red = ProductVariant.objects.create(product=runner, color_name="Red")
+        blue = ProductVariant.objects.create(product=runner, color_name="Blue")
+        red_m = ProductSize.objects.create(variant=red, size_label="m", stock=2)
+        ProductSize.objects.create(variant=blue, size_label="L", stock=0)
+        Product.objects.create(title="Sold out", price=50, vendor=vendor)
+
+    runner.refresh_from_db()
+    assert runner.available_sizes == ["M"]
+    assert runner.available_colors == ["red"]
+
+    client = APIClient()
+    assert [p["title"] for p in client.get("/api/products/", {"size": "M,XL"}).data["results"]] == ["Runner"]
+    assert client.get("/api/products/", {"color": "blue"}).data["count"] == 0
+    assert [p["title"] for p in client.get("/api/products/", {"in_stock": "false"}).data["results"]] == ["Sold out"]
+
+    # Selling the last unit takes the size and color out of the arrays
+    with django_capture_on_commit_callbacks(execute=True):
+        red_m.stock = 0
+        red_m.save()
+    assert client.get("/api/products/", {"size": "m"}).data["count"] == 0
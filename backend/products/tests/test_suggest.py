@@ -0,0 +1,47 @@
+import pytest
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from products.models import Product, Category
+from products.suggest import PrefixIndex, suggest_index
+
+User = get_user_model()
+
+
+def test_prefix_index_matches_any_word_start():
+    index = PrefixIndex()
+    index.add("product", 1, {"label": "Trail Running Shoe"})
+    index.add("product", 2, {"label": "Running Bag"})
+    index.add("category", 1, {"label": "Rûnning gear"})
+
+    assert [s["label"] for s in index.lookup("RUN")] == ["Running Bag", "Rûnning gear", "Trail Running Shoe"]
+    assert [s["label"] for s in index.lookup("running s")] == ["Trail Running Shoe"]
+    assert index.lookup("run", limit=1) == [{"label": "Running Bag"}]
+
+    index.remove("product", 2)
+    assert [s["label"] for s in index.lookup("run")] == ["Rûnning gear", "Trail Running Shoe"]
+
+
+@pytest.mark.django_db
+def test_suggest_refreshes_incrementally(settings, django_assert_num_queries, django_capture_on_commit_callbacks):
+    settings.SUGGEST_REFRESH_INTERVAL = 0
+    vendor = User.objects.create_user(
+        username="vendor", email="vendor@test.com", password="pass1234", role="vendor"
+    )
+    Category.objects.create(name="Sneakers", slug="sneakers")
+    shoe = Product.objects.create(title="Trail Shoe", price=50, vendor=vendor)
+    suggest_index.rebuild()
+    client = APIClient()
+
+    response = client.get("/api/products/suggest/", {"q": "s"})
+    assert [s["label"] for s in response.data["results"]] == ["Trail Shoe", "Sneakers"]
+
+    with django_assert_num_queries(0):
+        client.get("/api/products/suggest/", {"q": "tra"})
+
+    with django_capture_on_commit_callbacks(execute=True):
+        shoe.title = "Road Shoe"
+        shoe.save()
+    with django_assert_num_queries(1):  # reload the one changed product
+        response = client.get("/api/products/suggest/", {"q": "ro"})
+    assert response.data["results"] == [{"type": "product", "label": "Road Shoe", "slug": shoe.slug}]
+    assert client.get("/api/products/suggest/", {"q": "tra"}).data["results"] == []
@@ -3,9 +3,13 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     VendorProductViewSet,
     ProductListView,
+    ProductFacetsView,
+    ProductSuggestView,
+    ProductBatchView,
     ProductDetailView,
     CategoryListView,
     ProductVariantViewSet,
+    ProductSizeViewSet,
 )
 
 router = DefaultRouter()
@@ -14,8 +18,13 @@ router.register(r'vendor/variants', ProductVariantViewSet, basename='product-var
 
 urlpatterns = [
     path("products/", ProductListView.as_view(), name="product-list"),
+    path("products/facets/", ProductFacetsView.as_view(), name="product-facets"),
+    path("products/batch/", ProductBatchView.as_view(), name="product-batch"),
+    path("products/suggest/", ProductSuggestView.as_view(), name="product-suggest"),
     path("products/<slug:slug>/", ProductDetailView.as_view(), name="product-detail"),
     path("categories/", CategoryListView.as_view(), name="category-list"),
+    # Only the bulk action of the size viewset is exposed
+    path("vendor/sizes/bulk-stock/", ProductSizeViewSet.as_view({"post": "bulk_stock"}), name="product-sizes-bulk-stock"),
     # Vendor endpoints (router-based)
     path("", include(router.urls)),
 ]
\ No newline at end of file
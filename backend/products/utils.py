@@ -1,3 +1,7 @@
+import re
+from collections import defaultdict
+
+
 def product_main_image_path(instance, filename):
     # Kept for historical migrations compatibility
     return f"products/{getattr(instance, 'slug', 'product')}/main/{filename}"
@@ -6,4 +10,17 @@ def product_variant_image_path(instance, filename):
     product_slug = instance.variant.product.slug if instance.variant and instance.variant.product else "unsaved_product"
     variant_color = instance.variant.color_name if instance.variant else "unsaved_variant"
     
-    return f"products/{product_slug}/variants/{variant_color}/{filename}"
\ No newline at end of file
+    return f"products/{product_slug}/variants/{variant_color}/{filename}"
+
+
+VARIANT_UPLOAD_KEY = re.compile(r"^variant_(\d+)_image_")
+
+
+def group_variant_uploads(files):
+    """Group `variant_{i}_image_*` uploads by variant index in a single pass"""
+    grouped = defaultdict(list)
+    for key, uploads in files.lists():
+        match = VARIANT_UPLOAD_KEY.match(key)
+        if match:
+            grouped[int(match.group(1))].extend(uploads)
+    return dict(grouped)
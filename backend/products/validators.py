@@ -1,6 +1,7 @@
-from PIL import Image
 from django.core.exceptions import ValidationError
 
+from core.validators import read_image_header
+
 # Product rules
 
 def pricing_rule(price):
@@ -15,8 +16,8 @@ def validate_image(images):
     if images.size > max_size:
         raise ValidationError("Sorry, the image must be under 5MB!")
     
-    img = Image.open(images)
+    image_format, _, _ = read_image_header(images)
     allowed_formats = ['JPG', 'JPEG', 'PNG', 'WEBP']
 
-    if img.format.upper() not in allowed_formats:
+    if image_format.upper() not in allowed_formats:
         raise ValidationError("Sorry, the image format must be JPG, PNG or WEBP!")
\ No newline at end of file
@@ -1,34 +1,83 @@
+import json
+import uuid
+
+from celery.result import AsyncResult
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
 from rest_framework import viewsets, generics, filters, status
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-from django_filters.rest_framework import DjangoFilterBackend, FilterSet, CharFilter
-from rest_framework.pagination import PageNumberPagination
+from django_filters.rest_framework import DjangoFilterBackend, FilterSet, BooleanFilter, CharFilter, NumberFilter
 
 from .models import Product, Category, ProductVariant, ProductSize, ProductImage
 from .serializers import (
     ProductSerializer,
     ProductPublicSerializer,
-    CategorySerializer,
+    CategoryListSerializer,
     ProductVariantSerializer,
     ProductSizeSerializer,
     ProductImageSerializer,
+    ProductCardSerializer,
+    BulkStockItemSerializer,
+)
+from .cache import (
+    CachedBatchMixin,
+    CachedETagListMixin,
+    CachedFacetsMixin,
+    CachedListMixin,
+    CachedRetrieveMixin,
 )
+from .facets import compute_facets
+from .fieldsets import Fieldset
+from .pagination import ProductPagination, ProductCursorPagination
 from .permissions import IsVendorOrAdmin
+from .search import ProductSearchFilter
+from .suggest import suggest_index
+from .stock import apply_size_stock_changes
+from .utils import group_variant_uploads
+from .importer import FORMATS as IMPORT_FORMATS
+from .tasks import import_products_task
 
-
-class ProductPagination(PageNumberPagination):
-    page_size = 20
-    page_size_query_param = "page_size"
-    max_page_size = 100
+IMPORT_OWNER_TTL = 60 * 60 * 24
+MAX_BULK_STOCK_ITEMS = 5000
+MAX_BATCH_IDS = 300
 
 
 class ProductFilter(FilterSet):
-    category = CharFilter(field_name="category__slug", lookup_expr="iexact")
+    # A category matches its whole subtree via one prefix scan on Category.path
+    category = CharFilter(method="filter_category")
+    # A product matches when any of its prices falls inside the range
+    price_min = NumberFilter(field_name="max_effective_price", lookup_expr="gte")
+    price_max = NumberFilter(field_name="min_effective_price", lookup_expr="lte")
+    # Comma-separated; a product matches when any listed size/color is in stock
+    size = CharFilter(method="filter_available", field_name="available_sizes")
+    color = CharFilter(method="filter_available", field_name="available_colors")
+    in_stock = BooleanFilter(method="filter_in_stock")
 
     class Meta:
         model = Product
-        fields = ["category"]
+        fields = ["category", "price_min", "price_max", "size", "color", "in_stock"]
+
+    def filter_category(self, queryset, name, value):
+        path = Category.objects.filter(slug__iexact=value).values_list("path", flat=True).first()
+        if path is None:
+            return queryset.none()
+        return queryset.filter(category__path__startswith=path)
+
+    def filter_available(self, queryset, name, value):
+        normalize = str.upper if name == "available_sizes" else str.lower
+        values = [normalize(item.strip()) for item in value.split(",") if item.strip()]
+        if not values:
+            return queryset
+        return queryset.filter(**{f"{name}__overlap": values})
+
+    def filter_in_stock(self, queryset, name, value):
+        return queryset.filter(stock__gt=0) if value else queryset.filter(stock=0)
 
 
 class VendorProductViewSet(viewsets.ModelViewSet):
@@ -44,34 +93,28 @@ class VendorProductViewSet(viewsets.ModelViewSet):
             return Product.objects.filter(vendor=user)
         return Product.objects.none()
 
-    def perform_create(self, serializer):
-        serializer.save(vendor=self.request.user)
+    def perform_create(self, serializer, **kwargs):
+        serializer.save(vendor=self.request.user, **kwargs)
 
     def create(self, request, *args, **kwargs):
-        # Handle variants data from JSON string
-        if 'variants' in request.data and isinstance(request.data['variants'], str):
+        # Handle variants data from JSON string (multipart requests)
+        data = request.data
+        if isinstance(data.get('variants'), str):
             try:
-                import json
-                request.data['variants'] = json.loads(request.data['variants'])
+                data = data.dict() if hasattr(data, 'dict') else dict(data)
+                data['variants'] = json.loads(data['variants'])
             except json.JSONDecodeError:
                 return Response({'variants': 'Invalid JSON format'}, status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = self.get_serializer(data=request.data)
+        serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
         
-        # Create the product with variants
-        product = serializer.save()
-        
-        # Handle image uploads for variants
-        for variant_index, variant in enumerate(product.variants.all()):
-            variant_images = []
-            for key, value in request.FILES.items():
-                if key.startswith(f'variant_{variant_index}_image_'):
-                    variant_images.append(value)
-            
-            for image_file in variant_images:
-                ProductImage.objects.create(variant=variant, image=image_file)
-        
+        # Create the product, its variants and their uploaded images in bulk
+        self.perform_create(serializer, variant_images=group_variant_uploads(request.FILES))
+        serializer.instance = Product.objects.prefetch_related(
+            "variants__images", "variants__sizes", "media_sections__items"
+        ).get(pk=serializer.instance.pk)
+
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
@@ -80,25 +123,152 @@ class VendorProductViewSet(viewsets.ModelViewSet):
         context["request"] = self.request
         return context
 
+    @action(detail=False, methods=["post"], url_path="import")
+    def import_products(self, request):
+        """Queue a CSV/JSONL catalog import; poll the returned status URL for progress"""
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"file": "A CSV or JSONL file is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = request.data.get("format") or upload.name.rsplit(".", 1)[-1].lower()
+        if fmt not in IMPORT_FORMATS:
+            return Response({"format": f"Must be one of: {', '.join(IMPORT_FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        file_name = default_storage.save(f"imports/{uuid.uuid4().hex}.{fmt}", upload)
+        task = import_products_task.delay(file_name, request.user.id, fmt)
+        cache.set(f"products:import:{task.id}", request.user.id, IMPORT_OWNER_TTL)
+
+        return Response(
+            {
+                "task_id": task.id,
+                "status_url": request.build_absolute_uri(f"{request.path.rstrip('/')}/{task.id}/"),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @action(detail=False, methods=["get"], url_path=r"import/(?P<task_id>[^/.]+)")
+    def import_status(self, request, task_id=None):
+        if cache.get(f"products:import:{task_id}") != request.user.id:
+            return Response({"error": "Import not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        result = AsyncResult(task_id)
+        data = {"task_id": task_id, "state": result.state}
+        if result.state == "PROGRESS":
+            data["progress"] = result.info
+        elif result.successful():
+            data["report"] = result.result
+        elif result.failed():
+            data["error"] = str(result.result)
+        return Response(data)
+
 
-class ProductListView(generics.ListAPIView):
+class ProductListView(CachedListMixin, generics.ListAPIView):
     serializer_class = ProductPublicSerializer
     permission_classes = [AllowAny]
     pagination_class = ProductPagination
 
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # Search runs last so relevance ordering can take over the default ordering
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductSearchFilter]
     filterset_class = ProductFilter
-    search_fields = ["title", "description"]
-    ordering_fields = ["base_price", "created_at"]
+    ordering_fields = ["base_price", "min_effective_price", "created_at"]
     ordering = ["-created_at"]
 
+    @property
+    def paginator(self):
+        """Page-number mode by default; keyset mode with ?cursor= or ?pagination=cursor"""
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params
+            if "cursor" in params or params.get("pagination") == "cursor":
+                self._paginator = ProductCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    # ?view=card reads only the precomputed ProductCard documents
+    card_fields = ["id", "badge", "title", "slug", "price", "base_price", "min_effective_price", "created_at", "card"]
+
+    def is_card_view(self):
+        return self.request.query_params.get("view") == "card"
+
+    def get_serializer_class(self):
+        if self.is_card_view():
+            return ProductCardSerializer
+        return super().get_serializer_class()
+
+    def get_fieldset(self):
+        if not hasattr(self, "_fieldset"):
+            self._fieldset = Fieldset.from_request(self.request, ProductPublicSerializer.Meta.fields)
+        return self._fieldset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if not self.is_card_view():
+            context["fieldset"] = self.get_fieldset()
+        return context
+
     def get_queryset(self):
-        return Product.objects.filter(is_active=True).prefetch_related(
-            "variants__images", "variants__sizes"
+        queryset = Product.objects.filter(is_active=True)
+        if self.is_card_view():
+            return queryset.select_related("card").only(*self.card_fields)
+        fieldset = self.get_fieldset()
+        return (
+            queryset.select_related(*fieldset.select_related())
+            .prefetch_related(*fieldset.prefetch_related())
+            .only(*fieldset.columns())
         )
 
 
-class ProductDetailView(generics.RetrieveAPIView):
+class ProductFacetsView(CachedFacetsMixin, generics.GenericAPIView):
+    """Category, color, size and price-range counts for the current filter/search"""
+    permission_classes = [AllowAny]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter]
+    filterset_class = ProductFilter
+
+    def get_queryset(self):
+        return Product.objects.filter(is_active=True)
+
+    def get_facets(self):
+        return compute_facets(self.filter_queryset(self.get_queryset()))
+
+
+class ProductSuggestView(APIView):
+    """Autocomplete over product titles, category names and shop names"""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            limit = 10
+        results = suggest_index.lookup(request.query_params.get("q", ""), max(limit, 1))
+        return Response({"results": results})
+
+
+class ProductBatchView(CachedBatchMixin, generics.GenericAPIView):
+    """Public representations for a known set of ids (cart, wishlist, history)"""
+    serializer_class = ProductPublicSerializer
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        return (
+            Product.objects.filter(is_active=True)
+            .select_related("category", "vendor")
+            .prefetch_related("variants__images", "variants__sizes")
+        )
+
+    def get(self, request):
+        try:
+            ids = list(dict.fromkeys(
+                int(pk) for pk in request.query_params.get("ids", "").split(",") if pk.strip()
+            ))
+        except ValueError:
+            return Response({"ids": ["Expected a comma-separated list of integers."]}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > MAX_BATCH_IDS:
+            return Response({"ids": [f"At most {MAX_BATCH_IDS} ids per request."]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"results": self.get_batch(request, ids)})
+
+
+class ProductDetailView(CachedRetrieveMixin, generics.RetrieveAPIView):
     serializer_class = ProductPublicSerializer
     permission_classes = [AllowAny]
     lookup_field = "slug"
@@ -109,10 +279,10 @@ class ProductDetailView(generics.RetrieveAPIView):
         )
 
 
-class CategoryListView(generics.ListAPIView):
-    serializer_class = CategorySerializer
+class CategoryListView(CachedETagListMixin, generics.ListAPIView):
+    serializer_class = CategoryListSerializer
     permission_classes = [AllowAny]
-    queryset = Category.objects.all()
+    queryset = Category.objects.order_by("name")
 
 
 class ProductVariantViewSet(viewsets.ModelViewSet):
@@ -146,6 +316,69 @@ class ProductSizeViewSet(viewsets.ModelViewSet):
             return ProductSize.objects.filter(variant__product__vendor=user)
         return ProductSize.objects.none()
 
+    @action(detail=False, methods=["post"], url_path="bulk-stock")
+    def bulk_stock(self, request):
+        """
+        Apply many stock changes at once, all or nothing.
+
+        Body: a list (or {"updates": [...]}) of items addressed by `id` or by
+        `product` slug + `color` + `size`, each with an absolute `stock` or a
+        `delta`. Items are applied in order, so later entries win.
+        """
+        items = request.data.get("updates") if isinstance(request.data, dict) else request.data
+        # Check the size before validating, so an oversized body is rejected cheaply
+        if isinstance(items, list) and len(items) > MAX_BULK_STOCK_ITEMS:
+            return Response(
+                {"error": f"At most {MAX_BULK_STOCK_ITEMS} updates per request"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        serializer = BulkStockItemSerializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data
+
+        # Resolve ids and natural keys with one ownership-scoped query
+        lookup = Q(pk__in=[item["id"] for item in items if "id" in item])
+        for item in items:
+            if "id" not in item:
+                lookup |= Q(
+                    variant__product__slug=item["product"],
+                    variant__color_name=item["color"],
+                    size_label=item["size"],
+                )
+        rows = self.get_queryset().filter(lookup).values_list(
+            "id", "variant__product__slug", "variant__color_name", "size_label", "variant__product_id"
+        )
+        by_id, by_key, product_of = {}, {}, {}
+        for pk, slug, color, label, product_id in rows:
+            by_id[pk] = pk
+            by_key[(slug, color, label)] = pk
+            product_of[pk] = product_id
+
+        changes, errors = {}, []
+        for index, item in enumerate(items):
+            if "id" in item:
+                pk = by_id.get(item["id"])
+            else:
+                pk = by_key.get((item["product"], item["color"], item["size"]))
+            if pk is None:
+                errors.append({"index": index, "error": "Size not found"})
+                continue
+            value, delta = changes.get(pk, (None, 0))
+            if "stock" in item:
+                value, delta = item["stock"], 0
+            else:
+                delta += item["delta"]
+            changes[pk] = (value, delta)
+
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        product_ids = {product_of[pk] for pk in changes}
+        with transaction.atomic():
+            apply_size_stock_changes(changes, product_ids)
+
+        return Response({"updated": len(changes), "products": sorted(product_ids)})
+
 
 class ProductImageViewSet(viewsets.ModelViewSet):
     serializer_class = ProductImageSerializer
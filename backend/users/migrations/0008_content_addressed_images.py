@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:19
+
+import core.storage
+import users.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_remove_permissionrole_permission_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customerprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.storage.ContentHashPath('profile_picture'), validators=[users.validators.validate_image_size]),
+        ),
+        migrations.AlterField(
+            model_name='vendorprofile',
+            name='shop_logo',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.storage.ContentHashPath('shop_logo'), validators=[users.validators.validate_image_size]),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from core.storage import ContentHashPath, content_addressed_storage
 from .validators import validate_image_size
 from django.utils import timezone
 from datetime import timedelta
@@ -43,7 +44,7 @@ class CustomerProfile(models.Model):
 
 
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="customer_profile")
-    profile_picture = models.ImageField(upload_to='media/profile_pictures/', validators=[validate_image_size], null=True, blank=True)
+    profile_picture = models.ImageField(upload_to=ContentHashPath("profile_picture"), storage=content_addressed_storage, validators=[validate_image_size], null=True, blank=True)
     phone_number = models.IntegerField(unique=True, blank=True, null=True)
     shipping_address = models.CharField(max_length=255, blank=True, null=True)
     billing_address = models.CharField(max_length=255, blank=True, null=True)
@@ -60,7 +61,7 @@ class VendorProfile(models.Model):
 
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="vendor_profile")
     shop_name = models.CharField(max_length=255, unique=True, blank=True, null=True)
-    shop_logo = models.ImageField(upload_to='media/shop_logo/', validators=[validate_image_size], null=True, blank=True)
+    shop_logo = models.ImageField(upload_to=ContentHashPath("shop_logo"), storage=content_addressed_storage, validators=[validate_image_size], null=True, blank=True)
     business_email = models.EmailField(unique=True, blank=True, null=True)
     phone_number = models.IntegerField(unique=True, blank=True, null=True)
     address = models.CharField(max_length=255, blank=True, null=True)
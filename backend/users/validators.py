@@ -1,9 +1,12 @@
 from django.core.exceptions import ValidationError
 
+from core.validators import read_image_header
+
 def validate_image_size(logo):
     max_size = 10 * 1024 * 1024
     if logo.size > max_size:
         raise ValidationError("The image size must be under 10MB!")
+    read_image_header(logo)
 
 
 def validate_document_size(business_document):